@@ -1,6 +1,20 @@
 # app/__init__.py
-from .app import dash_app
-from .layout import get_layout
-from .callbacks import register_callbacks
+# Exports are resolved on first access so that importing a submodule (e.g. app.tasks in a
+# job worker process) does not build the Dash app and import every page.
+import importlib
+
+_EXPORTS = {
+    "dash_app": ".app",
+    "get_layout": ".layout",
+    "register_callbacks": ".callbacks",
+}
 
 __all__ = ["dash_app", "get_layout", "register_callbacks"]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,162 @@
+# app/anomaly.py
+"""
+Occurrence-rate anomaly detection.
+
+Every series (operator x airport, operator, airport) is rolled up into one
+series x month count matrix with np.bincount, and the scores for all series
+and months come from cumulative sums over that matrix:
+    baseline  mean of the previous BASELINE_MONTHS months (current month excluded)
+    z         (count - baseline) / rolling std, std floored at 1
+    poisson_z Anscombe-transformed Poisson deviation 2*(sqrt(x+3/8) - sqrt(mu+3/8)),
+              approximately standard normal when counts are Poisson(mu)
+A month is flagged when poisson_z >= POISSON_Z and the count is at least MIN_COUNT.
+There is no per-group Python loop; the result is cached per data version.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .utils import derived, INCIDENT_AIRPORT_COL
+
+BASELINE_MONTHS = 12
+MIN_HISTORY = 6
+MIN_COUNT = 3
+POISSON_Z = 3.0
+RECENT_MONTHS = 3
+
+LEVELS = {
+    'pair': ['Operator', INCIDENT_AIRPORT_COL],
+    'operator': ['Operator'],
+    'airport': [INCIDENT_AIRPORT_COL],
+}
+
+
+def _month_ids(df: pd.DataFrame) -> np.ndarray:
+    """year*12 + month-1 per row, -1 where Date is missing."""
+    dates = pd.to_datetime(df['Date'], errors='coerce')
+    month = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.float64)
+    return np.where(np.isnan(month), -1, month).astype(np.int64)
+
+
+def _matrix(month: np.ndarray, keys: list, coded: dict):
+    """counts/labels/first month from precomputed month ids and per-column factorizations."""
+    ok = month >= 0
+    for k in keys:
+        ok &= coded[k][0] >= 0
+    if not ok.any():
+        return np.zeros((0, 0)), pd.DataFrame(columns=keys), None
+
+    m = month[ok]
+    m0 = int(m.min())
+    n_months = int(m.max()) - m0 + 1
+
+    # combine per-key codes with mixed radix, then factorize into dense series ids
+    combined = np.zeros(len(m), dtype=np.int64)
+    for k in keys:
+        codes, uniques = coded[k]
+        combined = combined * len(uniques) + codes[ok]
+    sid, uniq = pd.factorize(combined)
+    n_series = len(uniq)
+
+    counts = np.bincount(sid * n_months + (m - m0), minlength=n_series * n_months)
+    counts = counts.reshape(n_series, n_months).astype(np.float64)
+
+    # label of each series = keys of its first row
+    first = np.empty(n_series, dtype=np.int64)
+    first[sid[::-1]] = np.arange(len(sid))[::-1]
+    labels = pd.DataFrame({k: np.asarray(coded[k][1], dtype=object)[coded[k][0][ok][first]] for k in keys})
+    return counts, labels, pd.Period(year=m0 // 12, month=m0 % 12 + 1, freq='M')
+
+
+def monthly_matrix(df: pd.DataFrame, keys: list):
+    """
+    (counts[S, M], labels DataFrame[S, keys], first month as pd.Period)
+    where counts[s, m] is the number of occurrences of series s in month m.
+    """
+    return _matrix(_month_ids(df), keys, {k: pd.factorize(df[k]) for k in keys})
+
+
+def score(counts: np.ndarray, window: int = BASELINE_MONTHS):
+    """Rolling baseline, z and Poisson z for every cell of the series x month matrix."""
+    n_series, n_months = counts.shape
+    pad = np.zeros((n_series, 1))
+    cs = np.concatenate([pad, np.cumsum(counts, axis=1)], axis=1)
+    cs2 = np.concatenate([pad, np.cumsum(counts ** 2, axis=1)], axis=1)
+
+    t = np.arange(n_months)
+    lo = np.maximum(t - window, 0)
+    n = (t - lo).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (cs[:, t] - cs[:, lo]) / n
+        var = (cs2[:, t] - cs2[:, lo]) / n - mean ** 2
+        sd = np.sqrt(np.maximum(var, 1.0))
+        z = (counts - mean) / sd
+        poisson_z = 2.0 * (np.sqrt(counts + 0.375) - np.sqrt(mean + 0.375))
+    history = np.broadcast_to(n >= MIN_HISTORY, counts.shape)
+    z = np.where(history, z, np.nan)
+    poisson_z = np.where(history, poisson_z, np.nan)
+    return mean, z, poisson_z
+
+
+def detect(df: pd.DataFrame) -> pd.DataFrame:
+    """All flagged (series, month) cells for every level, strongest first."""
+    cols = ['level', 'Operator', INCIDENT_AIRPORT_COL, 'month', 'count', 'baseline', 'z', 'poisson_z']
+    if df is None or df.empty or 'Date' not in df.columns:
+        return pd.DataFrame(columns=cols)
+    # dates and key columns are converted once and shared by every level
+    month = _month_ids(df)
+    coded = {k: pd.factorize(df[k]) for k in set(sum(LEVELS.values(), [])) if k in df.columns}
+    out = []
+    for level, keys in LEVELS.items():
+        if not set(keys).issubset(df.columns):
+            continue
+        counts, labels, first_month = _matrix(month, keys, coded)
+        if counts.size == 0:
+            continue
+        mean, z, pz = score(counts)
+        s_idx, m_idx = np.nonzero((np.nan_to_num(pz, nan=-np.inf) >= POISSON_Z) & (counts >= MIN_COUNT))
+        if len(s_idx) == 0:
+            continue
+        flagged = labels.iloc[s_idx].reset_index(drop=True)
+        flagged['level'] = level
+        flagged['month'] = [first_month + int(m) for m in m_idx]
+        flagged['count'] = counts[s_idx, m_idx].astype(int)
+        flagged['baseline'] = mean[s_idx, m_idx]
+        flagged['z'] = z[s_idx, m_idx]
+        flagged['poisson_z'] = pz[s_idx, m_idx]
+        out.append(flagged)
+    if not out:
+        return pd.DataFrame(columns=cols)
+    return pd.concat(out, ignore_index=True).reindex(columns=cols).sort_values('poisson_z', ascending=False, ignore_index=True)
+
+
+def anomalies() -> pd.DataFrame:
+    """detect() over the full register, computed once per data version."""
+    return derived('anomalies', detect)
+
+
+def _last_month(df):
+    if df is None or df.empty or 'Date' not in df.columns:
+        return None
+    last = pd.to_datetime(df['Date'], errors='coerce').max()
+    return None if pd.isna(last) else last.to_period('M')
+
+
+def recent_anomalies(store: dict = None, months: int = RECENT_MONTHS, limit: int = 8) -> pd.DataFrame:
+    """Flags in the last `months` months of the register, narrowed to the operator/airport filter."""
+    flags = anomalies()
+    last = derived('last_month', _last_month)
+    if flags.empty or last is None:
+        return flags
+    flags = flags[flags['month'] > last - months]
+    s = store or {}
+    if s.get('operator') not in (None, '', 'All'):
+        flags = flags[flags['Operator'] == s['operator']]
+    if s.get('airport') not in (None, '', 'All'):
+        flags = flags[flags[INCIDENT_AIRPORT_COL] == s['airport']]
+    return flags.head(limit)
+
+
+def describe(row) -> str:
+    who = ' @ '.join(str(row[c]) for c in ('Operator', INCIDENT_AIRPORT_COL) if pd.notna(row[c]))
+    return f"{who} — {row['month'].strftime('%b %Y')}: {row['count']} vs {row['baseline']:.1f} expected"
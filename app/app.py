@@ -2,17 +2,25 @@
 from dash import Dash
 import flask
 
+try:
+    # gzip/brotli for callback responses (large figure JSON); optional dependency
+    import flask_compress  # noqa: F401
+    COMPRESS_RESPONSES = True
+except ImportError:
+    COMPRESS_RESPONSES = False
+
 app = Dash(__name__)
 server = app.server
 
 def create_dash_app(server=None, url_base_pathname='/'):
     """Create and return a Dash app instance.
     Keep suppress_callback_exceptions True to allow modular callbacks.
+    Callback responses are compressed when flask-compress is installed.
     """
     if server is None:
         server = flask.Flask(__name__)
     app = Dash(__name__, server=server, url_base_pathname=url_base_pathname,
-               suppress_callback_exceptions=True)
+               suppress_callback_exceptions=True, compress=COMPRESS_RESPONSES)
     return app
 
 dash_app = create_dash_app()
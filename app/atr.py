@@ -0,0 +1,268 @@
+# app/atr.py
+"""
+Recommendation / ATR (Action Taken Report) tracking.
+
+ATRTracker keeps a normalized status code per occurrence plus open/close dates, and
+maintains the aggregates the dashboard needs incrementally:
+    pending counts and days-to-close (mean, p50, p90) for the whole register,
+    per operator, per airport and per operator x airport.
+summary() is a dictionary lookup; record_atr() updates everything in place.
+
+ATRs recorded through the 'Upload ATR' button are appended to the dataset's ATR log
+(utils.ATR_LOG_CSV for the default dataset, see datasets.py). Every gunicorn worker
+replays new log lines on access (sync()), so workers agree without rebuilding, and a
+tracker rebuilt for a new data version replays the whole log.
+"""
+
+import bisect
+import csv
+import os
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from .utils import dataset_paths, derived, get_data, sn_index, sn_key, INCIDENT_AIRPORT_COL
+
+ATR_COL = 'ATR of Recommendations'
+OPEN_DATE_COLS = ['Recommendation Date', 'Date of Recommendation', 'Date']
+CLOSE_DATE_COLS = ['ATR Date', 'Date of ATR', 'ATR Received Date', 'Closure Date', 'Date of Closure']
+
+PENDING, RECEIVED, CLOSED, UNKNOWN = 'PENDING', 'RECEIVED', 'CLOSED', 'UNKNOWN'
+# an ATR that has been received counts as closing the recommendation for days-to-close
+CLOSING_CODES = (RECEIVED, CLOSED)
+STATUS_LABELS = {PENDING: 'Pending', RECEIVED: 'Received', CLOSED: 'Closed', UNKNOWN: ''}
+
+
+def normalize_status(value) -> str:
+    v = str(value).strip().lower() if value is not None and not pd.isna(value) else ''
+    if not v:
+        return UNKNOWN
+    if 'pend' in v or v in ('open', 'awaited', 'due'):
+        return PENDING
+    if 'clos' in v or 'accept' in v or v in ('complied', 'implemented'):
+        return CLOSED
+    if 'recei' in v or 'submit' in v or v in ('atr received', 'yes'):
+        return RECEIVED
+    return UNKNOWN
+
+
+def normalize_series(s: pd.Series) -> pd.Series:
+    """normalize_status() evaluated once per distinct value."""
+    uniques = pd.Series(s.dropna().unique())
+    mapping = dict(zip(uniques, (normalize_status(v) for v in uniques)))
+    # mapping a categorical yields a categorical, which cannot take UNKNOWN as a fill value
+    return s.map(mapping).astype(object).fillna(UNKNOWN)
+
+
+def _first_col(df, candidates):
+    return next((c for c in candidates if c in df.columns), None)
+
+
+def _percentile(sorted_vals, q):
+    if not sorted_vals:
+        return None
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))]
+
+
+class ATRTracker:
+
+    def __init__(self, log_path: str = None):
+        self._lock = threading.RLock()
+        self.log_path = log_path or dataset_paths()['atr_log']
+        self.codes = pd.Series(dtype=object)        # row label -> status code
+        self.days = pd.Series(dtype=float)          # row label -> days to close (NaN if open)
+        self.opened = {}                            # row label -> open date
+        self.group_of = {}                          # row label -> (operator, airport)
+        self.pending = Counter()                    # group key -> pending count
+        self.closed_days = {}                       # group key -> sorted days-to-close
+        self.closed_sum = Counter()                 # group key -> sum of days-to-close
+        self._log_offset = 0
+
+    # -----------------------------------------
+    # build (vectorized, once per data version)
+    # -----------------------------------------
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        t = cls()
+        if df is None or df.empty:
+            return t
+        idx = df.index
+        codes = normalize_series(df[ATR_COL]) if ATR_COL in df.columns else pd.Series(UNKNOWN, index=idx)
+        open_col, close_col = _first_col(df, OPEN_DATE_COLS), _first_col(df, CLOSE_DATE_COLS)
+        opened = pd.to_datetime(df[open_col], errors='coerce') if open_col else pd.Series(pd.NaT, index=idx)
+        closed = pd.to_datetime(df[close_col], errors='coerce') if close_col else pd.Series(pd.NaT, index=idx)
+        days = (closed - opened).dt.days.astype(float).where(codes.isin(CLOSING_CODES))
+
+        ops = df['Operator'].astype(object).where(df['Operator'].notna(), None) if 'Operator' in df.columns else pd.Series(None, index=idx, dtype=object)
+        aps = df[INCIDENT_AIRPORT_COL].astype(object).where(df[INCIDENT_AIRPORT_COL].notna(), None) if INCIDENT_AIRPORT_COL in df.columns else pd.Series(None, index=idx, dtype=object)
+
+        t.codes = codes.astype(object)
+        t.days = days
+        t.opened = opened.dropna().to_dict()
+        t.group_of = dict(zip(idx, zip(ops, aps)))
+
+        frame = pd.DataFrame({'op': ops, 'ap': aps, 'pending': codes.eq(PENDING), 'days': days}, index=idx)
+        for name, by in (('operator', ['op']), ('airport', ['ap']), ('pair', ['op', 'ap'])):
+            grouped = frame.groupby(by, dropna=True)
+            for key, n in grouped['pending'].sum().items():
+                t.pending[(name,) + (key if isinstance(key, tuple) else (key,))] = int(n)
+            for key, vals in grouped['days'].apply(lambda s: sorted(s.dropna().tolist())).items():
+                k = (name,) + (key if isinstance(key, tuple) else (key,))
+                t.closed_days[k] = vals
+                t.closed_sum[k] = sum(vals)
+        t.pending[('all',)] = int(frame['pending'].sum())
+        t.closed_days[('all',)] = sorted(days.dropna().tolist())
+        t.closed_sum[('all',)] = sum(t.closed_days[('all',)])
+        return t
+
+    # -----------------------------------------
+    # incremental updates
+    # -----------------------------------------
+    def _group_keys(self, label):
+        op, ap = self.group_of.get(label, (None, None))
+        keys = [('all',)]
+        if op is not None:
+            keys.append(('operator', op))
+        if ap is not None:
+            keys.append(('airport', ap))
+        if op is not None and ap is not None:
+            keys.append(('pair', op, ap))
+        return keys
+
+    def _apply(self, label, code, when=None):
+        old = self.codes.get(label)
+        if old is None:
+            return False
+        keys = self._group_keys(label)
+        old_days = self.days.get(label)
+        if old == PENDING:
+            for k in keys:
+                self.pending[k] -= 1
+        if old_days is not None and not pd.isna(old_days):
+            for k in keys:
+                lst = self.closed_days.get(k, [])
+                i = bisect.bisect_left(lst, old_days)
+                if i < len(lst) and lst[i] == old_days:
+                    lst.pop(i)
+                    self.closed_sum[k] -= old_days
+        new_days = float('nan')
+        if code in CLOSING_CODES and label in self.opened:
+            when = pd.Timestamp.now() if when is None or pd.isna(when) else pd.Timestamp(when)
+            new_days = float((when.normalize() - self.opened[label].normalize()).days)
+            for k in keys:
+                bisect.insort(self.closed_days.setdefault(k, []), new_days)
+                self.closed_sum[k] += new_days
+        if code == PENDING:
+            for k in keys:
+                self.pending[k] += 1
+        self.codes.loc[label] = code
+        self.days.loc[label] = new_days
+        return True
+
+    def sync(self):
+        """Apply ATR log lines appended since the last call (possibly by another worker)."""
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return
+        if size <= self._log_offset:
+            return
+        with self._lock:
+            with open(self.log_path, 'rb') as fh:
+                fh.seek(self._log_offset)
+                chunk = fh.read()
+            # leave a partially written last line for the next sync
+            chunk = chunk[:chunk.rfind(b'\n') + 1]
+            self._log_offset += len(chunk)
+            index, labels = sn_index(), get_data().index
+            for row in csv.reader(chunk.decode('utf-8').splitlines()):
+                if len(row) < 3:
+                    continue
+                pos = index.get(sn_key(row[0]))
+                if pos is not None:
+                    self._apply(labels[pos], row[1], pd.to_datetime(row[2], errors='coerce'))
+
+    # -----------------------------------------
+    # reads
+    # -----------------------------------------
+    def _stats(self, key):
+        lst = self.closed_days.get(key, [])
+        return {
+            'pending': int(self.pending.get(key, 0)),
+            'closed': len(lst),
+            'avg_days': (self.closed_sum[key] / len(lst)) if lst else None,
+            'p50_days': _percentile(lst, 0.5),
+            'p90_days': _percentile(lst, 0.9),
+        }
+
+    def summary(self, operator=None, airport=None) -> dict:
+        """O(1) aggregates for the register, one operator, one airport or a pair."""
+        if operator and airport:
+            key = ('pair', operator, airport)
+        elif operator:
+            key = ('operator', operator)
+        elif airport:
+            key = ('airport', airport)
+        else:
+            key = ('all',)
+        with self._lock:
+            return self._stats(key)
+
+    def summarize_rows(self, df: pd.DataFrame) -> dict:
+        """Same aggregates for an arbitrary filtered frame (vectorized over its rows)."""
+        with self._lock:
+            codes = self.codes.reindex(df.index)
+            days = self.days.reindex(df.index).dropna()
+        return {
+            'pending': int(codes.eq(PENDING).sum()),
+            'closed': int(len(days)),
+            'avg_days': float(days.mean()) if len(days) else None,
+            'p50_days': float(days.quantile(0.5, interpolation='nearest')) if len(days) else None,
+            'p90_days': float(days.quantile(0.9, interpolation='nearest')) if len(days) else None,
+        }
+
+    def codes_for(self, df: pd.DataFrame) -> pd.Series:
+        with self._lock:
+            return self.codes.reindex(df.index).fillna(UNKNOWN)
+
+    def status_of(self, sn) -> str:
+        pos = sn_index().get(sn_key(sn))
+        if pos is None:
+            return UNKNOWN
+        with self._lock:
+            return self.codes.get(get_data().index[pos], UNKNOWN)
+
+
+def tracker() -> ATRTracker:
+    t = derived('atr_tracker', ATRTracker.from_frame)
+    t.sync()
+    return t
+
+
+def record_atr(sn, status: str = RECEIVED, when=None) -> bool:
+    """Record an ATR for one occurrence: persist to the log, then update aggregates in place."""
+    code = normalize_status(status) if status not in STATUS_LABELS else status
+    if sn_index().get(sn_key(sn)) is None:
+        return False
+    when = pd.Timestamp(when) if when else pd.Timestamp.now()
+    with open(dataset_paths()['atr_log'], 'a', newline='') as fh:
+        csv.writer(fh).writerow([sn_key(sn), code, when.date().isoformat(), pd.Timestamp.now().isoformat(timespec='seconds')])
+    tracker().sync()
+    return True
+
+
+def dashboard_summary(df: pd.DataFrame, store: dict = None) -> dict:
+    """
+    Aggregates for the dashboard KPIs. Views filtered only by operator and/or airport
+    read the precomputed aggregates; any other filter falls back to summarize_rows().
+    """
+    t = tracker()
+    s = store or {}
+    others = [k for k in ('aircraft', 'phase', 'status') if s.get(k) and s.get(k) != 'All']
+    dated = s.get('month') or s.get('date_from') or s.get('date_to')
+    if not others and not dated and not (s.get('search') or '').strip():
+        op = s.get('operator') if s.get('operator') not in (None, '', 'All') else None
+        ap = s.get('airport') if s.get('airport') not in (None, '', 'All') else None
+        return t.summary(op, ap)
+    return t.summarize_rows(df if df is not None else pd.DataFrame())
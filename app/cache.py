@@ -0,0 +1,221 @@
+# app/cache.py
+"""
+In-process caches shared by the render paths.
+
+- LRUCache: small thread-safe LRU (gunicorn gthread workers serve callbacks concurrently),
+  optionally bounded by memory as well (the dataset cache in utils.py).
+- cached_figure(): builds a plotly figure once per distinct aggregate and keeps it as
+  pre-serialized, optionally compressed, JSON. Repeat renders skip plotly.express and
+  plotly's own serialization and hand dcc.Graph a plain dict. The most recently used
+  figures are also kept decoded, so their hits skip decompression and json.loads as well;
+  other hits pay both. Dash still serializes the dict into the callback response.
+
+pandas and plotly are imported on first use so importing this module (callbacks.py does at
+startup) stays cheap.
+
+Tunables (environment):
+    DGCA_FIGURE_CACHE_SIZE         max cached figures per worker (default 128)
+    DGCA_FIGURE_HOT_SIZE           of those, max kept decoded as dicts (default 16)
+    DGCA_FIGURE_CACHE_COMPRESSION  'gzip' (default), 'br' (needs brotli) or 'none'
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+FIGURE_CACHE_SIZE = int(os.environ.get("DGCA_FIGURE_CACHE_SIZE", "128"))
+FIGURE_HOT_SIZE = int(os.environ.get("DGCA_FIGURE_HOT_SIZE", "16"))
+FIGURE_CACHE_COMPRESSION = os.environ.get("DGCA_FIGURE_CACHE_COMPRESSION", "gzip").lower()
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used mapping with a fixed number of entries and, with
+    `max_bytes`, a memory budget: every entry carries a size (given to set() or measured
+    with `sizeof`) and the least recently used entries are evicted until the total fits.
+    `on_evict(key, value)` is called for entries evicted to make room.
+    """
+
+    def __init__(self, maxsize: int = 128, max_bytes: int = None, sizeof=None, on_evict=None):
+        self.maxsize = max(int(maxsize), 1)
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._sizes = {}
+        self.nbytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, size: int = None):
+        if size is None and self.max_bytes is not None:
+            size = self.sizeof(value) if self.sizeof is not None else sizeof(value)
+        evicted = []
+        with self._lock:
+            self.nbytes -= self._sizes.pop(key, 0)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = size or 0
+            self.nbytes += size or 0
+            # the entry just set is kept even if it alone exceeds max_bytes
+            while len(self._data) > 1 and (len(self._data) > self.maxsize or
+                                           (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+                old_key, old_value = self._data.popitem(last=False)
+                self.nbytes -= self._sizes.pop(old_key, 0)
+                self.evictions += 1
+                evicted.append((old_key, old_value))
+        if self.on_evict is not None:
+            for old_key, old_value in evicted:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self.nbytes -= self._sizes.pop(key, 0)
+            return self._data.pop(key, default)
+
+    def discard_where(self, predicate) -> int:
+        """Drop every entry whose key satisfies predicate(key); returns how many."""
+        with self._lock:
+            keys = [k for k in self._data if predicate(k)]
+            for k in keys:
+                del self._data[k]
+                self.nbytes -= self._sizes.pop(k, 0)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses,
+                    "bytes": self.nbytes, "evictions": self.evictions}
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+def sizeof(value, _depth: int = 0) -> int:
+    """
+    Approximate memory held by a cached value: exact for pandas/numpy objects, and a
+    shallow walk (two levels) over dicts, lists, tuples and plain objects otherwise.
+    """
+    import sys
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True, index=True).sum())
+    if isinstance(value, (pd.Series, pd.Index)):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    size = sys.getsizeof(value)
+    if _depth >= 2:
+        return size
+    if isinstance(value, dict):
+        return size + sum(sizeof(k, _depth + 1) + sizeof(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(sizeof(v, _depth + 1) for v in value)
+    if hasattr(value, "__dict__"):
+        return size + sizeof(vars(value), _depth + 1)
+    return size
+
+
+def frame_key(*parts) -> str:
+    """
+    Stable digest of the given parts. DataFrames/Series are hashed by content
+    (values, index and column names) so equal aggregates map to the same key.
+    """
+    import pandas as pd
+
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            h.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode())
+            try:
+                h.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+            except TypeError:
+                # unhashable cells (lists/dicts) - fall back to the JSON form
+                h.update(part.to_json(date_format="iso").encode())
+        else:
+            h.update(repr(part).encode())
+        h.update(b"\x1f")
+    return h.hexdigest()
+
+
+def _encode(payload: str):
+    raw = payload.encode("utf-8")
+    if FIGURE_CACHE_COMPRESSION == "br" and brotli is not None:
+        return "br", brotli.compress(raw)
+    if FIGURE_CACHE_COMPRESSION in ("gzip", "br"):
+        return "gzip", gzip.compress(raw, compresslevel=5)
+    return "none", raw
+
+
+def _decode(entry) -> str:
+    codec, blob = entry
+    if codec == "br":
+        blob = brotli.decompress(blob)
+    elif codec == "gzip":
+        blob = gzip.decompress(blob)
+    return blob.decode("utf-8")
+
+
+_FIGURES = LRUCache(FIGURE_CACHE_SIZE)
+# decoded dicts of the hottest figures (shared between renders: treat them as read-only)
+_HOT_FIGURES = LRUCache(FIGURE_HOT_SIZE)
+
+
+def cached_figure(kind: str, data, build, *params) -> dict:
+    """
+    Return the figure for `data` as a plain dict, building it with `build(data)` only
+    when this (kind, data, params) combination has not been rendered before.
+    `data` should be the aggregate the figure is drawn from, not the raw frame.
+    The dict may be shared with other renders and must not be modified.
+    """
+    key = frame_key(kind, data, *params)
+    fig = _HOT_FIGURES.get(key)
+    if fig is not None:
+        return fig
+    entry = _FIGURES.get(key)
+    if entry is None:
+        import plotly.io as pio
+
+        payload = pio.to_json(build(data), validate=False)
+        _FIGURES.set(key, _encode(payload))
+    else:
+        payload = _decode(entry)
+    fig = json.loads(payload)
+    _HOT_FIGURES.set(key, fig)
+    return fig
+
+
+def figure_cache_stats() -> dict:
+    return dict(_FIGURES.stats(), hot=_HOT_FIGURES.stats())
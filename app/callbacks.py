@@ -1,21 +1,26 @@
 # app/callbacks.py
-from dash.dependencies import Input, Output
-from dash import callback_context
-import pandas as pd
-from pandas.tseries.offsets import MonthEnd
-
-from .utils import load_data
-from .pages.home import (
-    render_dashboard,
-    render_detail,
-    render_recommendations,
-    render_storyboard,
-)
+from dash.dependencies import Input, Output, State, ALL
+from dash import callback_context, dcc, no_update
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+# Only dash and light modules are imported here: pandas, the data layer and the page
+# modules (plotly.express) are imported inside the functions that use them, so a worker
+# can register callbacks and bind its port before paying for them (see app/warmup.py).
+from . import jobs
+from .cache import LRUCache
+from .datasets import on_dataset_evicted, use_dataset
+from .pages.jobs import render_jobs, render_job_list
 
 # -----------------------------------------
 # Helper: dropdown option builder
 # -----------------------------------------
 def make_options_from_series(series):
+    import pandas as pd
+
     if series is None:
         return [{'label': 'All', 'value': 'All'}]
 
@@ -31,11 +36,44 @@ def make_options_from_series(series):
 # -----------------------------------------
 # Filtering logic
 # -----------------------------------------
+def date_window(store):
+    """
+    (start, end) of the store's date filters, end exclusive: the month from 'month-picker'
+    intersected with the 'date-range' picker (date_from / date_to, both inclusive days).
+    Missing or unparseable values leave that side open.
+    """
+    import pandas as pd
+
+    s = store or {}
+    start = end = None
+    month = pd.to_datetime(s.get('month') or None, errors='coerce')
+    if pd.notna(month):
+        start = pd.Timestamp(month.year, month.month, 1)
+        end = start + pd.DateOffset(months=1)
+    date_from = pd.to_datetime(s.get('date_from') or None, errors='coerce')
+    if pd.notna(date_from):
+        date_from = date_from.normalize()
+        start = date_from if start is None else max(start, date_from)
+    date_to = pd.to_datetime(s.get('date_to') or None, errors='coerce')
+    if pd.notna(date_to):
+        date_to = date_to.normalize() + pd.Timedelta(days=1)
+        end = date_to if end is None else min(end, date_to)
+    return start, end
+
+
 def apply_filters(df, store):
+    import numpy as np
+    from .utils import contains_ci, date_slice, equals_ci
+
     if df is None or df.empty:
         return df
     s = store or {}
 
+    # Date window first: on the date-sorted register (utils.sort_by_date) it is a
+    # binary-search slice, and every later mask runs over the window only
+    start, end = date_window(s)
+    df = date_slice(df, start, end)
+
     # Exact filters
     airport_val = s.get('airport')
     if airport_val and airport_val != 'All':
@@ -56,39 +94,116 @@ def apply_filters(df, store):
 
     status_val = s.get('status')
     if status_val and status_val != 'All' and 'Status' in df.columns:
-        df = df[df['Status'].str.lower() == status_val.lower()]
-
-    # Month filter
-    month_val = s.get('month')
-    if month_val and 'Date' in df.columns:
-        try:
-            selected = pd.to_datetime(month_val, errors='coerce')
-            if pd.notna(selected):
-                start = pd.Timestamp(selected.year, selected.month, 1)
-                end = start + MonthEnd(0)
-                df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-                df = df[(df['Date'] >= start) & (df['Date'] <= end)]
-        except:
-            pass
+        df = df[equals_ci(df['Status'], status_val)]
 
     # Free text search
     q = (s.get('search') or "").strip().lower()
     if q:
-        def match(row):
-            for col in [
-                'S/N', 'Flight No', 'Operator',
-                'Brief Description', 'Airport / Place of occurrence'
-            ]:
-                if col in df.columns and pd.notna(row.get(col)):
-                    if q in str(row[col]).lower():
-                        return True
-            return False
-
-        df = df[df.apply(match, axis=1)]
+        # vectorized per column; categorical columns only search their categories
+        mask = np.zeros(len(df), dtype=bool)
+        for col in [
+            'S/N', 'Flight No', 'Operator',
+            'Brief Description', 'Airport / Place of occurrence'
+        ]:
+            if col in df.columns:
+                mask |= contains_ci(df[col], q)
+        df = df[mask]
 
     return df
 
 
+# filtered frames keyed by (data version, filter store) so the dashboard and its
+# lazily-loaded map/chart callbacks filter once per filter change; bounded by memory
+# as well, since with several datasets the views of large registers add up
+FILTERED_CACHE_MB = float(os.environ.get("DGCA_FILTERED_CACHE_MB", "512"))
+_FILTERED = LRUCache(32, max_bytes=int(FILTERED_CACHE_MB * 1e6))
+
+
+@on_dataset_evicted
+def _drop_filtered(path):
+    _FILTERED.discard_where(lambda key: key[0][0] == path)
+
+
+def filtered_data(store):
+    """apply_filters() over the store's dataset (see datasets.py); returns a private copy."""
+    from .utils import get_data, data_version
+
+    with use_dataset((store or {}).get('dataset')):
+        key = (data_version(), json.dumps(store or {}, sort_keys=True, default=str))
+        filtered = _FILTERED.get(key)
+        if filtered is None:
+            df = get_data()
+            filtered = apply_filters(df.copy() if df is not None else df, store)
+            _FILTERED.set(key, filtered)
+    return filtered.copy() if filtered is not None else filtered
+
+
+# store-filter before any filter is touched (what update_store() returns initially)
+DEFAULT_FILTERS = {'search': '', 'airport': 'All', 'operator': 'All', 'aircraft': 'All',
+                   'phase': 'All', 'status': 'All', 'month': '', 'date_from': '', 'date_to': '',
+                   'dataset': 'default'}
+
+
+def render_page(trigger, store, sn=None):
+    """
+    Page for a display_page() trigger (None on the initial call). Module-level so that
+    app/warmup.py can render filter states through exactly the same path.
+    """
+    with use_dataset((store or {}).get('dataset')):
+        return _render_page(trigger, store, sn)
+
+
+def _render_page(trigger, store, sn=None):
+    from .pages.home import render_dashboard, render_detail, render_recommendations, render_storyboard
+
+    filtered_df = filtered_data(store)
+
+    if trigger is None:
+        # deep link: /?sn=<S/N> opens that investigation directly
+        return render_detail(filtered_df, sn) if sn else render_dashboard(filtered_df, store=store)
+    if trigger == 'store-filter':
+        return render_dashboard(filtered_df, store=store)
+    if trigger == 'url' and sn:
+        return render_detail(filtered_df, sn)
+    if trigger == 'nav-detail':
+        return render_detail(filtered_df, sn)
+    if trigger == 'nav-recs':
+        return render_recommendations(filtered_df)
+    if trigger == 'nav-story':
+        return render_storyboard(filtered_df)
+    if trigger == 'nav-jobs':
+        return render_jobs(filtered_df)
+
+    return render_dashboard(filtered_df, store=store)
+
+
+# -----------------------------------------
+# Filter usage log (mined by app/warmup.py)
+# -----------------------------------------
+FILTER_LOG = os.environ.get("DGCA_FILTER_LOG", os.path.join("logs", "filter_usage.jsonl"))
+# rotated to FILTER_LOG + '.1' (replacing the previous one) once it reaches this size
+FILTER_LOG_MAX_BYTES = int(float(os.environ.get("DGCA_FILTER_LOG_MB", "5")) * 1024 * 1024)
+_FILTER_LOG_LOCK = threading.Lock()
+
+
+def log_filter_usage(store):
+    """Append the dashboard filter state to FILTER_LOG (the access log has no request bodies)."""
+    if not FILTER_LOG or not store:
+        return
+    line = json.dumps({'ts': int(time.time()), 'store': store}, sort_keys=True, default=str)
+    try:
+        os.makedirs(os.path.dirname(FILTER_LOG) or '.', exist_ok=True)
+        with _FILTER_LOG_LOCK:
+            with open(FILTER_LOG, 'a') as fh:
+                fh.write(line + '\n')
+                full = fh.tell() >= FILTER_LOG_MAX_BYTES
+            if full:
+                # at most two files on disk; another worker's concurrent line may land in either
+                os.replace(FILTER_LOG, FILTER_LOG + '.1')
+    except OSError as e:
+        print(f"[callbacks.log_filter_usage] cannot write {FILTER_LOG}: {e}")
+
+
 # -----------------------------------------
 # Register Callbacks
 # -----------------------------------------
@@ -104,10 +219,14 @@ def register_callbacks(app):
             Output('status-filter', 'options'),
         ],
         [Input('page-content', 'children')],
+        State('store-filter', 'data'),
         prevent_initial_call=False
     )
-    def populate_filter_options(_children):
-        df = load_data()
+    def populate_filter_options(_children, store):
+        from .utils import get_data
+
+        with use_dataset((store or {}).get('dataset')):
+            df = get_data()
         if df is None or df.empty:
             return [{'label': 'All', 'value': 'All'}] * 5
 
@@ -126,7 +245,18 @@ def register_callbacks(app):
 
         return airport_opts, operator_opts, aircraft_opts, phase_opts, status_opts
 
-    # Update store when any filter changes
+    # Datasets this deployment serves (re-read from the registry on each page load)
+    @app.callback(
+        Output('dataset-filter', 'options'),
+        Input('url', 'pathname'),
+        prevent_initial_call=False
+    )
+    def populate_dataset_options(_pathname):
+        from .datasets import options
+
+        return options()
+
+    # Update store when any filter changes (DEFAULT_FILTERS is the initial value)
     @app.callback(
         Output('store-filter', 'data'),
         [
@@ -137,10 +267,13 @@ def register_callbacks(app):
             Input('phase-filter', 'value'),
             Input('status-filter', 'value'),
             Input('month-picker', 'date'),
+            Input('date-range', 'start_date'),
+            Input('date-range', 'end_date'),
+            Input('dataset-filter', 'value'),
         ],
         prevent_initial_call=False
     )
-    def update_store(search, airport, operator, aircraft, phase, status, month_date):
+    def update_store(search, airport, operator, aircraft, phase, status, month_date, date_from, date_to, dataset):
         return {
             'search': search or "",
             'airport': airport or "All",
@@ -149,6 +282,9 @@ def register_callbacks(app):
             'phase': phase or "All",
             'status': status or "All",
             'month': month_date or "",
+            'date_from': date_from or "",
+            'date_to': date_to or "",
+            'dataset': dataset or "default",
         }
 
     # Router + reactive dashboard
@@ -159,29 +295,183 @@ def register_callbacks(app):
             Input('nav-detail', 'n_clicks'),
             Input('nav-recs', 'n_clicks'),
             Input('nav-story', 'n_clicks'),
+            Input('nav-jobs', 'n_clicks'),
+            Input('url', 'search'),
             Input('store-filter', 'data'),
         ],
         prevent_initial_call=False
     )
     def display_page(*args):
         ctx = callback_context
-        df = load_data()
-
         store = args[-1]
-        filtered_df = apply_filters(df.copy() if df is not None else df, store)
+        sn = (parse_qs((args[-2] or '').lstrip('?')).get('sn') or [None])[0]
+        trig = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+        if trig in (None, 'store-filter'):
+            log_filter_usage(store)
+        return render_page(trig, store, sn)
 
-        if not ctx.triggered:
-            return render_dashboard(filtered_df)
+    # Lazily-loaded dashboard parts: fire once the placeholders from
+    # render_dashboard() are mounted, after the KPI cards are already visible
+    @app.callback(
+        Output('dash-charts', 'children'),
+        [Input('dash-charts', 'id'), Input('metric-toggle', 'value')],
+        State('store-filter', 'data'),
+    )
+    def load_charts(_id, metric, store):
+        from .pages.home import render_charts
+
+        with use_dataset((store or {}).get('dataset')):
+            return render_charts(filtered_data(store), metric or 'count', store)
+
+    @app.callback(
+        Output('dash-map', 'children'),
+        [Input('dash-map', 'id'), Input('map-mode', 'value')],
+        State('store-filter', 'data'),
+    )
+    def load_map(_id, mode, store):
+        from .pages.home import render_map
+
+        with use_dataset((store or {}).get('dataset')):
+            return render_map(filtered_data(store), mode or 'points')
+
+    # Clicking a row of the investigations table opens its detail page. The page is
+    # rendered here as well because re-clicking the S/N already in the URL does not
+    # change 'url.search'; the index lookup makes the duplicate render negligible.
+    @app.callback(
+        [Output('page-content', 'children', allow_duplicate=True), Output('url', 'search')],
+        Input('table-occ', 'active_cell'),
+        State('store-filter', 'data'),
+        prevent_initial_call=True
+    )
+    def open_detail(active_cell, store):
+        from .pages.detail import render_detail
+
+        if not active_cell or active_cell.get('row_id') is None:
+            return no_update, no_update
+        sn = active_cell['row_id']
+        with use_dataset((store or {}).get('dataset')):
+            return render_detail(filtered_data(store), sn), f"?sn={sn}"
+
+    # Record an ATR from the detail page; aggregates update in place (app/atr.py)
+    @app.callback(
+        Output('atr-status', 'children'),
+        Input('btn-upload-atr', 'n_clicks'),
+        [State('detail-sn', 'data'), State('atr-status-input', 'value'), State('atr-date-input', 'date'),
+         State('store-filter', 'data')],
+        prevent_initial_call=True
+    )
+    def upload_atr(_n, sn, status, atr_date, store):
+        from . import atr
+
+        with use_dataset((store or {}).get('dataset')):
+            if not atr.record_atr(sn, status or atr.RECEIVED, atr_date):
+                return f"ATR status: could not record ATR for S/N {sn}"
+            return f"ATR status: {atr.STATUS_LABELS[atr.tracker().status_of(sn)]} (recorded)"
+
+    # Background jobs (app/jobs.py): start, poll progress, cancel
+    @app.callback(
+        Output('job-ids', 'data'),
+        [
+            Input('btn-job-geocode', 'n_clicks'),
+            Input('btn-job-trends', 'n_clicks'),
+            Input('btn-job-export', 'n_clicks'),
+        ],
+        [State('store-filter', 'data'), State('job-ids', 'data')],
+        prevent_initial_call=True
+    )
+    def start_job(_geocode, _trends, _export, store, job_ids):
+        from . import tasks, utils
+
+        trig = callback_context.triggered[0]['prop_id'].split('.')[0]
+        # job processes get the dataset's file paths, not the session's dataset id
+        with use_dataset((store or {}).get('dataset')):
+            version, paths = utils.data_version(), utils.dataset_paths()
+        if trig == 'btn-job-geocode':
+            job_id = jobs.submit('Geocode full register', tasks.geocode_register,
+                                 paths['data'], paths['master'],
+                                 key=jobs.job_key('geocode', version))
+        elif trig == 'btn-job-trends':
+            job_id = jobs.submit('Multi-year trends', tasks.trend_recompute, paths['data'], 5,
+                                 key=jobs.job_key('trends', version, 5))
+        else:
+            job_id = jobs.submit('Filtered export', tasks.bulk_export, paths['data'], store,
+                                 key=jobs.job_key('export', version, json.dumps(store or {}, sort_keys=True)))
+        job_ids = [j for j in (job_ids or []) if j != job_id]
+        return job_ids + [job_id]
+
+    @app.callback(
+        Output('job-list', 'children'),
+        [Input('job-poll', 'n_intervals'), Input('job-ids', 'data')],
+    )
+    def poll_jobs(_n, job_ids):
+        return render_job_list(job_ids)
 
-        trig = ctx.triggered[0]['prop_id'].split('.')[0]
+    @app.callback(
+        Output('job-cancel-ack', 'children'),
+        Input({'type': 'job-cancel', 'index': ALL}, 'n_clicks'),
+        prevent_initial_call=True
+    )
+    def cancel_job(clicks):
+        trig = callback_context.triggered_id
+        if not trig or not any(clicks or []):
+            return ''
+        return 'Cancelling…' if jobs.cancel(trig['index']) else ''
+
+    # Server-side report for the current filtered view
+    @app.callback(
+        Output('download-report', 'data'),
+        Input('btn-print', 'n_clicks'),
+        State('store-filter', 'data'),
+        prevent_initial_call=True
+    )
+    def export_report(_n, store):
+        import pandas as pd
+        from . import reports
 
-        if trig == 'store-filter':
-            return render_dashboard(filtered_df)
-        if trig == 'nav-detail':
-            return render_detail(filtered_df)
-        if trig == 'nav-recs':
-            return render_recommendations(filtered_df)
-        if trig == 'nav-story':
-            return render_storyboard(filtered_df)
+        with use_dataset((store or {}).get('dataset')):
+            ext, payload = reports.render_file(filtered_data(store), 'Occurrence & Investigation report', store)
+        return dcc.send_bytes(payload, f"dgca-report-{pd.Timestamp.now():%Y%m%d-%H%M}.{ext}")
+
+    # Bulk export links for the current filters (app/export.py)
+    @app.callback(
+        [Output('export-csv', 'href'), Output('export-parquet', 'href')],
+        Input('store-filter', 'data'),
+    )
+    def update_export_links(store):
+        from .export import export_href
+
+        return export_href(store, 'csv'), export_href(store, 'parquet')
+
+    # Batch per-operator / per-airport reports, split across the job pool
+    @app.callback(
+        Output('job-ids', 'data', allow_duplicate=True),
+        [
+            Input('btn-job-reports-operator', 'n_clicks'),
+            Input('btn-job-reports-airport', 'n_clicks'),
+        ],
+        [State('store-filter', 'data'), State('job-ids', 'data')],
+        prevent_initial_call=True
+    )
+    def start_report_batch(_op, _ap, store, job_ids):
+        from . import reports, utils
 
-        return render_dashboard(filtered_df)
\ No newline at end of file
+        trig = callback_context.triggered[0]['prop_id'].split('.')[0]
+        by = 'Operator' if trig == 'btn-job-reports-operator' else 'Airport / Place of occurrence'
+        df = filtered_data(store)
+        if df is None or by not in df.columns:
+            return job_ids
+        counts = df[by].value_counts()
+        values = counts[counts > 0].index.tolist()  # categoricals list unused categories with 0
+        n_chunks = max(1, min(jobs.JOB_WORKERS, len(values)))
+        with use_dataset((store or {}).get('dataset')):
+            version, data_path = utils.data_version(), utils.dataset_paths()['data']
+        new_ids = []
+        for i in range(n_chunks):
+            chunk = values[i::n_chunks]
+            if not chunk:
+                continue
+            new_ids.append(jobs.submit(
+                f"{by} reports ({i + 1}/{n_chunks})", reports.report_batch,
+                data_path, store, by, chunk,
+                key=jobs.job_key('reports', version, by, json.dumps(store or {}, sort_keys=True), i, n_chunks)))
+        return [j for j in (job_ids or []) if j not in new_ids] + new_ids
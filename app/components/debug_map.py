@@ -1,49 +1,52 @@
 # debug_map.py
-import os, pandas as pd
-from pathlib import Path
+# python -m app.components.debug_map   (paths from app/utils.py or DGCA_DATA_CSV / DGCA_AIRPORT_MASTER_CSV)
+import os
+import pandas as pd
 
-AIRPORT_MASTER = "airports_india.csv"
-INCIDENTS = "/Users/karunatirkey/Downloads/sample_data.csv"  # change if needed
+from app.ingest import clean_incidents, clean_master, summarize, unmatched_airports
+from app.utils import AIRPORT_MASTER_CSV, DATA_CSV, INCIDENT_AIRPORT_COL, MASTER_CODE_COL, MASTER_LAT_COL, MASTER_LON_COL
+
+AIRPORT_MASTER = AIRPORT_MASTER_CSV
+INCIDENTS = DATA_CSV
 
 print("Airports path:", AIRPORT_MASTER, "exists:", os.path.exists(AIRPORT_MASTER))
 print("Incidents path:", INCIDENTS, "exists:", os.path.exists(INCIDENTS))
 
-am = pd.read_csv(AIRPORT_MASTER) if os.path.exists(AIRPORT_MASTER) else pd.DataFrame()
-inc = pd.read_csv(INCIDENTS, parse_dates=['Date']) if os.path.exists(INCIDENTS) else pd.DataFrame()
+am_raw = pd.read_csv(AIRPORT_MASTER) if os.path.exists(AIRPORT_MASTER) else pd.DataFrame()
+inc_raw = pd.read_csv(INCIDENTS, low_memory=False) if os.path.exists(INCIDENTS) else pd.DataFrame()
+
+# same normalization as the app applies at load (app/ingest.py)
+am, am_report = clean_master(am_raw)
+codes = am[MASTER_CODE_COL].dropna() if am is not None and MASTER_CODE_COL in am.columns else None
+inc, report = clean_incidents(inc_raw, master_codes=codes)
 
 print("\n--- Airport master ---")
-print("shape:", None if am is None else getattr(am,'shape',None))
-print("columns:", list(am.columns)[:50])
-print(am.head().to_string(index=False))
+print("shape:", getattr(am_raw, 'shape', None))
+print("columns:", list(am_raw.columns)[:50])
+print("renamed:", am_report.get('renamed_columns'), "missing:", am_report.get('missing_columns'))
+if am is not None and not am.empty:
+    print(am.head().to_string(index=False))
 
 print("\n--- Incidents ---")
-print("shape:", None if inc is None else getattr(inc,'shape',None))
-print("columns:", list(inc.columns)[:50])
-print(inc.head().to_string(index=False))
-
-# try common join keys
-possible_inc_keys = [c for c in inc.columns if c.lower() in ('airport','airport name','airport code','iata','icao','code')]
-possible_am_keys  = [c for c in am.columns if 'airport' in c.lower() or 'code' in c.lower() or 'iata' in c.lower() or 'icao' in c.lower()]
-print("\nDetected incident keys:", possible_inc_keys)
-print("Detected airport master keys:", possible_am_keys)
-
-# If we can detect a pair, test the join
-if possible_inc_keys and possible_am_keys:
-    inc_key = possible_inc_keys[0]
-    am_key = possible_am_keys[0]
-    print(f"\nTrying join: incidents.{inc_key} -> airport_master.{am_key}")
-    merged = inc.merge(am[[am_key] + [c for c in am.columns if 'lat' in c.lower() or 'lon' in c.lower()]],
-                       left_on=inc_key, right_on=am_key, how='left')
-    # count how many got coords
-    lat_cols = [c for c in merged.columns if 'lat' in c.lower()]
-    lon_cols = [c for c in merged.columns if any(x in c.lower() for x in ('lon','lng','long'))]
-    print("Found lat cols in merged:", lat_cols)
-    print("Found lon cols in merged:", lon_cols)
-    if lat_cols and lon_cols:
-        merged[lat_cols[0]] = pd.to_numeric(merged[lat_cols[0]], errors='coerce')
-        merged[lon_cols[0]] = pd.to_numeric(merged[lon_cols[0]], errors='coerce')
-        print("Rows with coords after join:", merged.dropna(subset=[lat_cols[0], lon_cols[0]]).shape[0], "of", merged.shape[0])
+print("shape:", getattr(inc_raw, 'shape', None))
+print("columns:", list(inc_raw.columns)[:50])
+print("renamed:", report.get('renamed_columns'), "missing:", report.get('missing_columns'))
+if not inc.empty:
+    print(inc.head().to_string(index=False))
+
+# test the join the app uses: incidents[INCIDENT_AIRPORT_COL] -> master[MASTER_CODE_COL] (codes canonicalized at ingest)
+if INCIDENT_AIRPORT_COL in inc.columns and am is not None and MASTER_CODE_COL in am.columns:
+    print(f"\nTrying join: incidents.{INCIDENT_AIRPORT_COL} -> airport_master.{MASTER_CODE_COL}")
+    keys = am[[MASTER_CODE_COL] + [c for c in (MASTER_LAT_COL, MASTER_LON_COL) if c in am.columns]]
+    merged = inc.merge(keys, left_on=INCIDENT_AIRPORT_COL, right_on=MASTER_CODE_COL, how='left')
+    report['master'] = am_report
+    report['unmatched_airports'] = unmatched_airports(merged, merged[MASTER_CODE_COL].notna())
+    if MASTER_LAT_COL in merged.columns and MASTER_LON_COL in merged.columns:
+        print("Rows with coords after join:", merged.dropna(subset=[MASTER_LAT_COL, MASTER_LON_COL]).shape[0], "of", merged.shape[0])
     else:
         print("No lat/lon columns found in airport master.")
+    print("Unmatched airports (rows):", report['unmatched_airports']['values'])
 else:
-    print("Could not detect sensible join keys automatically. Please post the column names of both CSVs.")
+    print("Could not find the join columns. Please post the column names of both CSVs.")
+
+print("\nQuality:", summarize(report))
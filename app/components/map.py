@@ -4,8 +4,9 @@ Map builder (merged pipeline inside map module).
 
 Behavior:
 - If caller passes a dataframe `df`, the module will try to use its Latitude/Longitude.
-- If df is None, the module will read incidents from DATA_CSV (from utils.py) and
-  airport master from AIRPORT_MASTER_CSV and perform merging here.
+- If df is None, the module uses the cached, already cleaned dataset (utils.get_data).
+- A frame without coordinates is merged with the airport master here (names, whitespace
+  and codes are normalized once at ingest, see app/ingest.py).
 - Merge strategy:
     1) exact join: incidents["Airport / Place of occurrence"] == master["Code"]
     2) if very few matches, fuzzy-match incident text to master["Airport Name"] and map coordinates
@@ -17,41 +18,11 @@ import pandas as pd
 from dash import dcc, html
 import plotly.express as px
 import difflib
-import os
-
-# Try import constants from utils; if not present, fallback to known workspace path
-try:
-    from ..utils import DATA_CSV, AIRPORT_MASTER_CSV, INCIDENT_AIRPORT_COL, MASTER_CODE_COL, MASTER_NAME_COL, MASTER_LAT_COL, MASTER_LON_COL
-except Exception:
-    # fallback defaults
-    DATA_CSV = "/Users/karunatirkey/Downloads/sample_data.csv"
-    AIRPORT_MASTER_CSV = "/mnt/data/c09c22cc-0788-45c5-b104-40c36b5a48d1.csv"
-    INCIDENT_AIRPORT_COL = "Airport / Place of occurrence"
-    MASTER_CODE_COL = "Code"
-    MASTER_NAME_COL = "Airport Name"
-    MASTER_LAT_COL = "Latitude"
-    MASTER_LON_COL = "Longitude"
-
-
-def _safe_read_csv(path, **kwargs):
-    """Read CSV safely; return empty df on failure and print diagnostics."""
-    try:
-        df = pd.read_csv(path, **kwargs)
-        return df
-    except Exception as e:
-        print(f"[map._safe_read_csv] failed to read {path}: {e}")
-        return pd.DataFrame()
-
-
-def _normalize_column_names(df: pd.DataFrame):
-    """Strip leading/trailing whitespace from string columns used as keys."""
-    for c in df.columns:
-        if df[c].dtype == object:
-            try:
-                df[c] = df[c].astype(str).str.strip()
-            except Exception:
-                pass
-    return df
+
+from ..cache import cached_figure
+
+from ..utils import (get_data, load_airport_master, normalize_airport_master, INCIDENT_AIRPORT_COL,
+                     MASTER_CODE_COL, MASTER_NAME_COL, MASTER_LAT_COL, MASTER_LON_COL)
 
 
 def _attempt_exact_join(incidents: pd.DataFrame, master: pd.DataFrame):
@@ -135,15 +106,12 @@ def build_map_component(df: Optional[pd.DataFrame] = None):
     """
     Main entrypoint:
     - If df provided and contains Latitude/Longitude -> plot from it.
-    - Else read DATA_CSV and AIRPORT_MASTER_CSV and perform merging here, then plot.
+    - Else merge it with the airport master here, then plot.
     Returns a dcc.Graph (Plotly scatter_mapbox) or an informative html.Div on failure.
     """
     # Defensive checks
     if df is None:
-        # read incidents
-        if not os.path.exists(DATA_CSV):
-            return html.Div(f"Incidents file not found: {DATA_CSV}", style={'color':'#ff6b6b','paddingTop':'120px','textAlign':'center','height':'880px'})
-        df = _safe_read_csv(DATA_CSV, parse_dates=['Date'], low_memory=False)
+        df = get_data()
 
     if df is None or df.empty:
         return html.Div("No incident data available.", style={'color':'#94a3b8','paddingTop':'120px','textAlign':'center','height':'880px'})
@@ -158,17 +126,11 @@ def build_map_component(df: Optional[pd.DataFrame] = None):
         if coords.empty:
             return html.Div("Coordinates present but invalid format in provided data.", style={'color':'#94a3b8','paddingTop':'120px','textAlign':'center','height':'880px'})
     else:
-        # Need to merge airport master here
-        if not os.path.exists(AIRPORT_MASTER_CSV):
-            return html.Div(f"Airport master file not found: {AIRPORT_MASTER_CSV}", style={'color':'#ff6b6b','paddingTop':'120px','textAlign':'center','height':'880px'})
-
-        master = _safe_read_csv(AIRPORT_MASTER_CSV)
+        # Need to merge airport master here (cleaned by the ingest stage)
+        master = normalize_airport_master(load_airport_master())
         if master is None or master.empty:
             return html.Div("Airport master is empty or couldn't be read.", style={'color':'#94a3b8','paddingTop':'120px','textAlign':'center','height':'880px'})
-
-        # Normalize names to avoid whitespace issues
-        df = _normalize_column_names(df)
-        master = _normalize_column_names(master)
+        df = df.copy()
 
         # Attempt exact join first
         merged, matched = _attempt_exact_join(df, master)
@@ -225,33 +187,60 @@ def build_map_component(df: Optional[pd.DataFrame] = None):
         if '_mapped_code' in row.index and pd.notna(row.get('_mapped_code')): parts.append(f"Mapped: {row.get('_mapped_code')}")
         return "<br>".join(parts)
 
-    coords['hover'] = coords.apply(hover_text, axis=1)
-
-    # center map
-    center_lat = coords['Latitude'].mean()
-    center_lon = coords['Longitude'].mean()
-    '''
-    fig = px.scatter_mapbox(
-        coords,
-        lat='Latitude',
-        lon='Longitude',
-        hover_name='hover',
-        hover_data={c: True for c in ['S/N', 'Date'] if c in coords.columns},
-        zoom=4,
-        height=360
-    )
-    '''
-
-    fig = px.scatter_mapbox(
-    coords,
-    lat='Latitude',
-    lon='Longitude',
-    hover_name='hover',
-    hover_data={c: True for c in ['S/N', 'Date'] if c in coords.columns},
-    zoom=4
-    )
+    def build_figure(points):
+        points = points.copy()
+        points['hover'] = points.apply(hover_text, axis=1)
+
+        # center map
+        center_lat = points['Latitude'].mean()
+        center_lon = points['Longitude'].mean()
+
+        fig = px.scatter_mapbox(
+            points,
+            lat='Latitude',
+            lon='Longitude',
+            hover_name='hover',
+            hover_data={c: True for c in ['S/N', 'Date'] if c in points.columns},
+            zoom=4
+        )
+        fig.update_layout(mapbox_style='open-street-map', margin={'l':0,'r':0,'t':0,'b':0}, mapbox_center={'lat': center_lat, 'lon': center_lon})
+        return fig
+
+    # only the columns the figure is drawn from take part in the cache key
+    point_cols = ['Latitude', 'Longitude'] + [c for c in ['S/N', 'Date', INCIDENT_AIRPORT_COL, '_master_code', '_mapped_code'] if c in coords.columns]
+    fig = cached_figure('map', coords[point_cols], build_figure)
 
+    return dcc.Graph(figure=fig, config={'displayModeBar': False}, style={'height':'880px'})
 
-    fig.update_layout(mapbox_style='open-street-map', margin={'l':0,'r':0,'t':0,'b':0}, mapbox_center={'lat': center_lat, 'lon': center_lon})
 
+def build_state_map_component(df: Optional[pd.DataFrame] = None):
+    """
+    Occurrences per state as a choropleth over the India states GeoJSON.
+    State assignment comes from app/spatial.py (computed once per data version).
+    """
+    from ..spatial import state_index, state_counts
+
+    index = state_index()
+    if index is None or index.name_key is None:
+        return html.Div("State boundaries not available (INDIA_GEOJSON).", style={'color':'#94a3b8','paddingTop':'120px','textAlign':'center','height':'880px'})
+    counts = state_counts(df if df is not None else pd.DataFrame())
+    if counts.empty:
+        return html.Div("No incidents could be assigned to a state.", style={'color':'#94a3b8','paddingTop':'120px','textAlign':'center','height':'880px'})
+
+    def build_figure(c):
+        fig = px.choropleth_mapbox(
+            c,
+            geojson=index.geojson,
+            locations='State',
+            featureidkey=f'properties.{index.name_key}',
+            color='count',
+            color_continuous_scale='Reds',
+            opacity=0.7,
+            zoom=3.6,
+            center={'lat': 22.5, 'lon': 80.0},
+        )
+        fig.update_layout(mapbox_style='open-street-map', margin={'l':0,'r':0,'t':0,'b':0})
+        return fig
+
+    fig = cached_figure('states', counts, build_figure, index.version)
     return dcc.Graph(figure=fig, config={'displayModeBar': False}, style={'height':'880px'})
@@ -0,0 +1,56 @@
+# app/concurrency.py
+"""
+Bounded thread pool shared by all requests of a worker, used to compute the independent
+parts of one render (figures, KPI aggregates, table records) concurrently. pandas/numpy
+release the GIL in most of the heavy kernels (groupby, value_counts, hashing, sorting).
+
+- The pool is bounded, so concurrent requests queue for render threads instead of each
+  spawning its own; the calling thread always computes one part itself, so a render
+  makes progress even when the pool is saturated.
+- Code already running on a pool thread runs nested parallel() calls inline, which
+  rules out deadlocks from a pool task waiting on tasks queued behind it.
+
+Tunables (environment):
+    DGCA_RENDER_THREADS  pool size per worker (default min(8, CPUs); 0 = run everything inline)
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+RENDER_THREADS = int(os.environ.get("DGCA_RENDER_THREADS", str(min(8, os.cpu_count() or 1))))
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def _mark_pool_thread():
+    _local.in_pool = True
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_THREADS, thread_name_prefix="dgca-render",
+                                           initializer=_mark_pool_thread)
+        return _executor
+
+
+def parallel(**tasks) -> dict:
+    """
+    Call every zero-argument callable in `tasks` and return {name: result}.
+    The first exception raised by a task is re-raised, as it would be sequentially.
+    """
+    if RENDER_THREADS <= 0 or len(tasks) < 2 or getattr(_local, "in_pool", False):
+        return {name: fn() for name, fn in tasks.items()}
+    names = list(tasks)
+    # the caller runs the last task itself while the pool works on the rest; tasks run in
+    # a copy of the caller's context so they see its dataset (datasets.use_dataset)
+    futures = {name: _get_executor().submit(contextvars.copy_context().run, tasks[name]) for name in names[:-1]}
+    results = {names[-1]: tasks[names[-1]]()}
+    for name in names[:-1]:
+        results[name] = futures[name].result()
+    return {name: results[name] for name in names}
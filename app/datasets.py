@@ -0,0 +1,129 @@
+# app/datasets.py
+"""
+Dataset registry: one deployment serves several incident registers (current year,
+archive, regional extracts, what-if scenarios).
+
+- Datasets are listed in a JSON file (DGCA_DATASETS, default ./datasets.json):
+      [{"id": "archive", "label": "Archive 2015-2023", "data": "/data/archive.csv",
+        "master": "/data/airports.csv"}, ...]
+  "master" defaults to utils.AIRPORT_MASTER_CSV and "atr_log" to atr_updates-<id>.csv.
+  The 'default' dataset (utils.DATA_CSV / AIRPORT_MASTER_CSV / ATR_LOG_CSV) is always
+  present unless the file redefines it. The file is re-read when it changes.
+- The session picks a dataset with the 'dataset-filter' dropdown; its id travels in the
+  'store-filter' data. Callbacks run inside use_dataset(id), and utils.get_data() /
+  derived() without an explicit path resolve to that dataset, so the analytics modules
+  stay dataset-agnostic. Frames and their derived indexes live in the memory-bounded
+  dataset cache in utils.py.
+
+Tunables (environment):
+    DGCA_DATASETS         registry file (default ./datasets.json)
+"""
+
+import contextvars
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+DATASETS_FILE = os.environ.get("DGCA_DATASETS", "datasets.json")
+DEFAULT_DATASET = "default"
+
+_current = contextvars.ContextVar("dgca_dataset", default=None)
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+_EVICT_LISTENERS = []
+
+
+def _default_entry() -> dict:
+    from . import utils
+
+    return {"id": DEFAULT_DATASET, "label": "Current register", "data": utils.DATA_CSV,
+            "master": utils.AIRPORT_MASTER_CSV, "atr_log": utils.ATR_LOG_CSV}
+
+
+def registry() -> dict:
+    """id -> dataset entry (id, label, data, master, atr_log), in file order."""
+    from . import utils
+
+    try:
+        st = os.stat(DATASETS_FILE)
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    with _REGISTRY_LOCK:
+        cached = _REGISTRY.get("entries")
+        if cached is None or cached[0] != stamp:
+            entries = {}
+            if stamp is not None:
+                try:
+                    with open(DATASETS_FILE) as fh:
+                        listed = json.load(fh)
+                    for item in listed:
+                        ds_id = str(item["id"])
+                        entries[ds_id] = {
+                            "id": ds_id,
+                            "label": item.get("label", ds_id),
+                            "data": item["data"],
+                            "master": item.get("master"),
+                            "atr_log": item.get("atr_log") or f"atr_updates-{ds_id}.csv",
+                        }
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    print(f"[datasets.registry] ignoring {DATASETS_FILE}: {e}")
+                    entries = {}
+            cached = (stamp, entries)
+            _REGISTRY["entries"] = cached
+    entries = dict(cached[1])
+    default = _default_entry()
+    # the default entry tracks utils' paths (they may be changed at runtime)
+    entries = {DEFAULT_DATASET: dict(default, **entries.pop(DEFAULT_DATASET, {})), **entries}
+    for entry in entries.values():
+        entry["master"] = entry.get("master") or utils.AIRPORT_MASTER_CSV
+    return entries
+
+
+def resolve(dataset_id=None) -> dict:
+    """Entry for `dataset_id`; unknown or missing ids fall back to the default dataset."""
+    entries = registry()
+    return entries.get(str(dataset_id)) if dataset_id and str(dataset_id) in entries else entries[DEFAULT_DATASET]
+
+
+def current() -> dict:
+    """The dataset selected by the enclosing use_dataset() (the default one otherwise)."""
+    entry = _current.get()
+    return entry if entry is not None else resolve(None)
+
+
+def for_data_path(path: str) -> dict:
+    """Entry whose data file is `path` (job processes only know the path), else the current one."""
+    for entry in registry().values():
+        if entry["data"] == path:
+            return entry
+    return dict(current(), data=path)
+
+
+@contextmanager
+def use_dataset(dataset_id=None):
+    """Resolve get_data()/derived() to `dataset_id` inside the block (this thread/context only)."""
+    token = _current.set(resolve(dataset_id))
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+def on_dataset_evicted(fn):
+    """Register fn(data_path), called when a dataset leaves the dataset cache (drop caches keyed by it)."""
+    _EVICT_LISTENERS.append(fn)
+    return fn
+
+
+def notify_evicted(path: str):
+    for fn in list(_EVICT_LISTENERS):
+        try:
+            fn(path)
+        except Exception as e:
+            print(f"[datasets.notify_evicted] listener failed for {path}: {e}")
+
+
+def options() -> list:
+    return [{"label": e["label"], "value": e["id"]} for e in registry().values()]
@@ -0,0 +1,159 @@
+# app/export.py
+"""
+Bulk export of filtered occurrences, for analysts who need the rows themselves rather
+than the dashboard table or the report.
+
+    GET  /export/occurrences.csv?operator=IndiGo&date_from=2024-01-01&dataset=archive
+    POST /export/occurrences.parquet   (JSON body: the 'store-filter' data)
+
+- Filters are the 'store-filter' keys understood by callbacks.apply_filters (missing
+  keys default to callbacks.DEFAULT_FILTERS); the header's CSV/Parquet links carry the
+  current filters in their query string.
+- The response is streamed: the date window is sliced out of the date-sorted register
+  (utils.date_slice), then the remaining filters run over blocks of EXPORT_CHUNK_ROWS
+  rows and each block is encoded and sent before the next one is filtered. A worker
+  therefore holds one block of output at a time, however large the export.
+- Parquet needs pyarrow; each block becomes one row group, and the bytes the writer
+  produces are handed to the client as soon as the row group is written.
+
+Tunables (environment):
+    DGCA_EXPORT_CHUNK_ROWS  rows per block / Parquet row group (default 20000)
+"""
+
+import io
+import os
+import time
+
+from flask import Blueprint, Response, abort, request
+
+EXPORT_CHUNK_ROWS = int(os.environ.get("DGCA_EXPORT_CHUNK_ROWS", "20000"))
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+# store keys that slice the date-sorted register before the block-wise filters
+DATE_KEYS = ("month", "date_from", "date_to")
+
+
+def _pyarrow():
+    """(pyarrow, pyarrow.parquet), imported on first use, or None without pyarrow."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:  # optional; Parquet exports return 501 without it
+        return None
+    return pyarrow, pyarrow.parquet
+
+
+# -----------------------------------------
+# Filtered blocks
+# -----------------------------------------
+def request_store() -> dict:
+    """Filter store from a JSON body or the query string, on top of DEFAULT_FILTERS."""
+    from .callbacks import DEFAULT_FILTERS
+
+    body = request.get_json(silent=True) if request.method == "POST" else None
+    given = body if isinstance(body, dict) else request.args.to_dict()
+    return dict(DEFAULT_FILTERS, **{k: v for k, v in given.items() if k in DEFAULT_FILTERS})
+
+
+def filtered_blocks(df, store: dict, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """Yield the rows of `df` matching `store`, filtering `chunk_rows` source rows at a time."""
+    from .callbacks import apply_filters, date_window
+    from .utils import date_slice
+
+    df = date_slice(df, *date_window(store))
+    rest = dict(store, **{k: '' for k in DATE_KEYS})
+    for start in range(0, len(df), chunk_rows):
+        block = apply_filters(df.iloc[start:start + chunk_rows], rest)
+        if len(block):
+            yield block
+
+
+# -----------------------------------------
+# Encoders
+# -----------------------------------------
+def iter_csv(df, store: dict):
+    yield df.iloc[:0].to_csv(index=False).encode("utf-8")
+    for block in filtered_blocks(df, store):
+        yield block.to_csv(index=False, header=False).encode("utf-8")
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose contents are taken (and released) after every row group."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def take(self) -> bytes:
+        out, self._parts = b"".join(self._parts), []
+        return out
+
+
+def _arrow_frame(block):
+    # object columns as nullable strings, so every block maps to the same Arrow schema
+    obj = [c for c in block.columns if block[c].dtype == object]
+    return block.astype({c: "string" for c in obj}) if obj else block
+
+
+def iter_parquet(df, store: dict):
+    pa, pq = _pyarrow()
+    sink = _Drain()
+    schema = pa.Schema.from_pandas(_arrow_frame(df.iloc[:0]), preserve_index=False)
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for block in filtered_blocks(df, store):
+            writer.write_table(pa.Table.from_pandas(_arrow_frame(block), schema=schema, preserve_index=False))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+# -----------------------------------------
+# Blueprint
+# -----------------------------------------
+export_bp = Blueprint("export", __name__)
+
+
+@export_bp.route("/occurrences.<fmt>", methods=["GET", "POST"])
+def export_occurrences(fmt):
+    from .datasets import use_dataset
+    from .utils import get_data
+
+    if fmt not in FORMATS:
+        abort(404)
+    if fmt == "parquet" and _pyarrow() is None:
+        abort(501, description="Parquet export needs pyarrow")
+    store = request_store()
+    with use_dataset(store.get("dataset")):
+        df = get_data()
+    if df is None or df.empty:
+        abort(404, description="incidents unavailable")
+    body = iter_csv(df, store) if fmt == "csv" else iter_parquet(df, store)
+    name = f"dgca-occurrences-{time.strftime('%Y%m%d-%H%M')}.{fmt}"
+    return Response(body, mimetype=FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{name}"'})
+
+
+def export_href(store: dict, fmt: str = "csv") -> str:
+    """Link to the export of the view `store` describes (used by the header links)."""
+    from urllib.parse import urlencode
+
+    args = {k: v for k, v in (store or {}).items() if v not in (None, "", "All")}
+    return f"/export/occurrences.{fmt}" + (f"?{urlencode(args)}" if args else "")
+
+
+def init_export(server):
+    """Register the export blueprint with the Flask server."""
+    server.register_blueprint(export_bp, url_prefix="/export")
@@ -0,0 +1,274 @@
+# app/ingest.py
+"""
+Ingest stage: validation and normalization of the incidents register and the airport
+master, run once per file version by utils.load_data() (whose result is cached in the
+dataset cache), so render paths get clean frames and never repeat the cleanup.
+
+- Column names: whitespace/case-insensitive match to the canonical names in utils.py,
+  plus known aliases ('Airport', 'IATA', 'Lat', ...).
+- Values: text stripped (blank -> missing), runs of whitespace collapsed in the
+  categorical fields, and case variants of one value ('INDIGO', 'IndiGo ') folded into
+  its most frequent spelling; master codes upper-case (airport_key()), and incident
+  airport values that are a master code in another case or padding ('del ') replaced by
+  that code, so every consumer can compare them with the master (and exposure) codes
+  directly while place names ('Near Pune') keep their spelling; Date parsed once.
+- Data-quality report per dataset: missing required columns, renamed columns, bad dates,
+  duplicate S/Ns, incidents whose airport is not in the master, master rows without a
+  code or coordinates and duplicate master codes. load_data() prints a summary;
+  quality_report() returns the full report of a loaded dataset.
+
+`python -m app.ingest [--data PATH] [--master PATH]` prints the report as JSON.
+"""
+
+import json
+import re
+
+import pandas as pd
+
+from .datasets import on_dataset_evicted
+from .utils import (CATEGORY_COLS, INCIDENT_AIRPORT_COL, MASTER_CODE_COL, MASTER_LAT_COL,
+                    MASTER_LON_COL, MASTER_NAME_COL, TEXT_COLS)
+
+REQUIRED_COLS = ["S/N", "Date", INCIDENT_AIRPORT_COL]
+# alternate spellings seen in DGCA extracts, matched after column_key()
+INCIDENT_ALIASES = {
+    INCIDENT_AIRPORT_COL: ["airport", "airport name", "airport/place", "place of occurrence"],
+    "S/N": ["sn", "s.no", "s. no.", "sl no", "serial no"],
+    "Date": ["date of occurrence", "occurrence date"],
+    "Flight No": ["flight no.", "flight number", "flight"],
+}
+MASTER_ALIASES = {
+    MASTER_CODE_COL: ["iata", "icao", "airport code", "iata code", "icao code"],
+    MASTER_NAME_COL: ["name", "airport"],
+    MASTER_LAT_COL: ["lat", "latitude_deg"],
+    MASTER_LON_COL: ["lon", "lng", "long", "longitude_deg"],
+}
+# categorical fields whose case variants are folded into one spelling
+CASE_FOLD_COLS = [c for c in CATEGORY_COLS if c != MASTER_CODE_COL]
+# values listed per problem in the report (counts are always complete)
+REPORT_SAMPLES = 20
+
+_WS = re.compile(r"\s+")
+_REPORTS = {}
+
+
+# -----------------------------------------
+# Column names
+# -----------------------------------------
+def column_key(name) -> str:
+    """'  Airport/ Place  of occurrence' -> 'airport / place of occurrence'."""
+    key = _WS.sub(" ", str(name)).strip().lower()
+    return re.sub(r"\s*/\s*", " / ", key)
+
+
+def normalize_columns(df: pd.DataFrame, canonical, aliases: dict = None):
+    """Rename columns to their canonical names; returns (frame, {old: new})."""
+    targets = {column_key(c): c for c in canonical}
+    for name, alts in (aliases or {}).items():
+        for alt in alts:
+            targets.setdefault(column_key(alt), name)
+    renamed = {}
+    for c in df.columns:
+        new = targets.get(column_key(c))
+        if new is not None and new != c and new not in df.columns and new not in renamed.values():
+            renamed[c] = new
+    return (df.rename(columns=renamed) if renamed else df), renamed
+
+
+# -----------------------------------------
+# Values
+# -----------------------------------------
+def strip_text(s: pd.Series, collapse: bool = False) -> pd.Series:
+    """Strip string values (blank -> missing); non-string values are kept as they are."""
+    if s.dtype != object:
+        return s
+    uniques = pd.Series(s.dropna().unique(), dtype=object)
+    if len(uniques) * 2 < len(s):
+        # low-cardinality columns: clean each distinct value once
+        return s.map(dict(zip(uniques, strip_text(uniques, collapse))))
+    try:
+        cleaned = s.str.replace(_WS, " ", regex=True) if collapse else s
+        cleaned = cleaned.str.strip()
+    except AttributeError:  # no string values at all
+        return s
+    out = cleaned.where(cleaned.notna(), s)
+    return out.mask(out.eq(""))
+
+
+def fold_case(s: pd.Series) -> pd.Series:
+    """Replace case variants of a value by its most frequent spelling."""
+    counts = s.dropna().astype(str).value_counts()
+    if counts.empty:
+        return s
+    keys = counts.index.str.lower()
+    if keys.is_unique:
+        return s
+    # value_counts is sorted by frequency, so the first spelling per key wins
+    canonical = dict(zip(keys[::-1], counts.index[::-1]))
+    variants = {v: canonical[k] for v, k in zip(counts.index, keys) if canonical[k] != v}
+    return s.replace(variants)
+
+
+def airport_key(s: pd.Series) -> pd.Series:
+    """Canonical airport code ('  del' -> 'DEL') of the master and exposure tables."""
+    return s.astype(str).str.strip().str.upper().where(s.notna())
+
+
+def canonical_airports(s: pd.Series, codes) -> pd.Series:
+    """Values that are one of `codes` up to case/padding become that code; place names stay as they are."""
+    key = airport_key(s)
+    return key.where(key.isin(set(codes)), s)
+
+
+def parse_dates(raw: pd.Series) -> pd.Series:
+    """Dates parsed once; values in another layout than the first are retried day-first."""
+    if pd.api.types.is_datetime64_any_dtype(raw):
+        return raw
+    parsed = pd.to_datetime(raw, errors="coerce")
+    retry = parsed.isna() & raw.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(raw[retry], errors="coerce", format="mixed", dayfirst=True)
+    return parsed
+
+
+def _samples(values) -> list:
+    return [str(v) for v in list(values)[:REPORT_SAMPLES]]
+
+
+# -----------------------------------------
+# Incidents / airport master
+# -----------------------------------------
+def clean_incidents(df: pd.DataFrame, date_cols=("Date",), master_codes=None):
+    """
+    Validated, normalized incidents frame and its quality report: (frame, report).
+    With `master_codes` (clean_master() codes), airport values are canonicalized against them.
+    """
+    df, renamed = normalize_columns(df, REQUIRED_COLS + CATEGORY_COLS + TEXT_COLS, INCIDENT_ALIASES)
+    report = {"rows": int(len(df)), "renamed_columns": renamed,
+              "missing_columns": [c for c in REQUIRED_COLS if c not in df.columns]}
+    df = df.copy()
+    for c in df.columns:
+        df[c] = strip_text(df[c], collapse=c in CATEGORY_COLS)
+    for c in CASE_FOLD_COLS:
+        if c in df.columns:
+            df[c] = fold_case(df[c])
+    if INCIDENT_AIRPORT_COL in df.columns and master_codes is not None:
+        df[INCIDENT_AIRPORT_COL] = canonical_airports(df[INCIDENT_AIRPORT_COL], master_codes)
+
+    for c in date_cols:
+        if c in df.columns:
+            raw = df[c]
+            df[c] = parse_dates(raw)
+            bad = df[c].isna() & raw.notna()
+            if c == "Date":
+                report["bad_dates"] = {"count": int(bad.sum()), "values": _samples(raw[bad].unique())}
+
+    if "S/N" in df.columns:
+        sn = df["S/N"].astype(str)
+        dup = sn[sn.duplicated(keep=False) & df["S/N"].notna()]
+        report["duplicate_sns"] = {"count": int(dup.nunique()), "values": _samples(dup.unique())}
+    return df, report
+
+
+def clean_master(am: pd.DataFrame):
+    """Airport master with canonical columns, upper-case codes and numeric coordinates: (frame, report)."""
+    if am is None or am.empty:
+        return am, {"rows": 0}
+    am, renamed = normalize_columns(am, [MASTER_CODE_COL, MASTER_NAME_COL, MASTER_LAT_COL, MASTER_LON_COL], MASTER_ALIASES)
+    # coordinates under other names ('Lat (deg)', 'longitude_dd', ...)
+    for name, hints in ((MASTER_LAT_COL, ("lat",)), (MASTER_LON_COL, ("lon", "lng", "long"))):
+        if name not in am.columns:
+            found = next((c for c in am.columns if any(h in str(c).lower() for h in hints)), None)
+            if found is not None:
+                am = am.rename(columns={found: name})
+                renamed[found] = name
+    report = {"rows": int(len(am)), "renamed_columns": renamed,
+              "missing_columns": [c for c in (MASTER_CODE_COL, MASTER_LAT_COL, MASTER_LON_COL) if c not in am.columns]}
+    am = am.copy()
+    for c in am.columns:
+        am[c] = strip_text(am[c], collapse=True)
+    if MASTER_CODE_COL in am.columns:
+        am[MASTER_CODE_COL] = airport_key(am[MASTER_CODE_COL])
+        no_code = am[MASTER_CODE_COL].isna()
+        dup = am.loc[~no_code & am[MASTER_CODE_COL].duplicated(keep=False), MASTER_CODE_COL]
+        report["missing_codes"] = int(no_code.sum())
+        report["duplicate_codes"] = {"count": int(dup.nunique()), "values": _samples(dup.unique())}
+        # first row per code wins, as in the incidents join
+        am = am[~no_code].drop_duplicates(subset=[MASTER_CODE_COL]).reset_index(drop=True)
+    for c in (MASTER_LAT_COL, MASTER_LON_COL):
+        if c in am.columns:
+            am[c] = pd.to_numeric(am[c], errors="coerce")
+    if MASTER_LAT_COL in am.columns and MASTER_LON_COL in am.columns:
+        missing = am[MASTER_LAT_COL].isna() | am[MASTER_LON_COL].isna()
+        report["missing_coords"] = {"count": int(missing.sum()),
+                                    "values": _samples(am.loc[missing, MASTER_CODE_COL]) if MASTER_CODE_COL in am.columns else []}
+    return am, report
+
+
+def unmatched_airports(df: pd.DataFrame, matched: pd.Series) -> dict:
+    """Incident airport values without a master code (`matched` is the per-row join result)."""
+    if INCIDENT_AIRPORT_COL not in df.columns:
+        return {"rows": 0, "values": {}}
+    miss = df[INCIDENT_AIRPORT_COL].notna() & ~matched
+    counts = df.loc[miss, INCIDENT_AIRPORT_COL].astype(str).value_counts()
+    return {"rows": int(miss.sum()), "distinct": int(len(counts)),
+            "values": {k: int(v) for k, v in counts.head(REPORT_SAMPLES).items()}}
+
+
+# -----------------------------------------
+# Reports
+# -----------------------------------------
+def record_report(path: str, report: dict):
+    """Keep the report of the dataset loaded from `path` and print its summary."""
+    _REPORTS[path] = report
+    print(f"[ingest] {path}: {summarize(report)}")
+
+
+def summarize(report: dict) -> str:
+    parts = [f"{report.get('rows', 0)} rows"]
+    if report.get("missing_columns"):
+        parts.append(f"missing columns {report['missing_columns']}")
+    if report.get("renamed_columns"):
+        parts.append(f"{len(report['renamed_columns'])} columns renamed")
+    for key, label in (("bad_dates", "bad dates"), ("duplicate_sns", "duplicate S/Ns")):
+        if report.get(key, {}).get("count"):
+            parts.append(f"{report[key]['count']} {label}")
+    unmatched = report.get("unmatched_airports", {})
+    if unmatched.get("rows"):
+        parts.append(f"{unmatched['rows']} rows with {unmatched['distinct']} unmatched airports")
+    master = report.get("master", {})
+    if master.get("duplicate_codes", {}).get("count"):
+        parts.append(f"{master['duplicate_codes']['count']} duplicate master codes")
+    if master.get("missing_coords", {}).get("count"):
+        parts.append(f"{master['missing_coords']['count']} master codes without coordinates")
+    return ", ".join(parts)
+
+
+def quality_report(path: str = None) -> dict:
+    """Quality report of the current dataset (or of `path`), loading it if needed."""
+    from .utils import dataset_paths, get_data
+
+    p = dataset_paths(path)["data"]
+    get_data(p)
+    return _REPORTS.get(p, {})
+
+
+@on_dataset_evicted
+def _drop_report(path):
+    _REPORTS.pop(path, None)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from . import ingest, utils  # load_data() records into app.ingest, not __main__
+
+    parser = argparse.ArgumentParser(description="Validate the incidents register and airport master.")
+    parser.add_argument("--data", default=None, help="incidents CSV (default: utils.DATA_CSV)")
+    parser.add_argument("--master", default=None, help="airport master CSV (default: utils.AIRPORT_MASTER_CSV)")
+    args = parser.parse_args()
+    if args.data:
+        utils.DATA_CSV = args.data
+    if args.master:
+        utils.AIRPORT_MASTER_CSV = args.master
+    print(json.dumps(ingest.quality_report(), indent=2, default=str))
@@ -0,0 +1,334 @@
+# app/jobs.py
+"""
+Background job runner for work that does not belong inside a callback
+(full-register geocoding, multi-year trend recomputation, bulk exports).
+
+- Jobs run in a local process pool, so a gunicorn gthread worker only pays for submit().
+- Job state lives in JOB_DIR (status JSON, cancel marker, pickled result) rather than in
+  worker memory, so any gunicorn worker can answer a progress poll or a cancel request.
+- Tasks are plain top-level functions `fn(ctx, *args)`; they report through
+  ctx.progress(done, total, message) and should call ctx.check_cancelled() between chunks.
+- Results are cached by key: submitting the same work again returns the finished job.
+- A running task touches a heartbeat file; a queued job records the process that owns
+  its pool. Jobs whose pool process died (worker restart, OOM kill, deploy) are found by
+  status()/submit() and marked failed, so the same work can be submitted again, and
+  cancel() finalizes them directly.
+- Status, result and output files of jobs finished more than DGCA_JOB_TTL_DAYS ago are
+  removed by a sweep that submit() runs at most once an hour per process.
+
+Tunables (environment):
+    DGCA_JOB_DIR        state/result directory (default ./jobs)
+    DGCA_JOB_WORKERS    pool size (default: half the CPUs, at least 1)
+    DGCA_JOB_HEARTBEAT  seconds between heartbeats of a running task (default 30)
+    DGCA_JOB_STALE      seconds without a heartbeat after which a running job has failed (default 300)
+    DGCA_JOB_TTL_DAYS   age after which finished jobs are removed (default 7)
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import Blueprint, abort, jsonify, send_file
+
+JOB_DIR = os.environ.get("DGCA_JOB_DIR", os.path.join(os.getcwd(), "jobs"))
+JOB_WORKERS = int(os.environ.get("DGCA_JOB_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+JOB_HEARTBEAT = float(os.environ.get("DGCA_JOB_HEARTBEAT", "30"))
+JOB_STALE = float(os.environ.get("DGCA_JOB_STALE", "300"))
+JOB_TTL = float(os.environ.get("DGCA_JOB_TTL_DAYS", "7")) * 86400
+SWEEP_INTERVAL = 3600
+
+FINAL_STATES = ("done", "failed", "cancelled")
+
+_executor = None
+_executor_lock = threading.Lock()
+_futures = {}  # job_id -> Future, only for jobs submitted by this process
+_last_sweep = [0.0]
+_HOST = socket.gethostname()
+
+
+class JobCancelled(Exception):
+    """Raised inside a task when its job has been cancelled."""
+
+
+# -----------------------------------------
+# Job state on disk
+# -----------------------------------------
+def _path(job_id, ext):
+    return os.path.join(JOB_DIR, f"{job_id}.{ext}")
+
+
+def _write_status(job_id, **fields):
+    status = read_status(job_id) or {"id": job_id}
+    status.update(fields, updated=time.time())
+    tmp = _path(job_id, f"json.{os.getpid()}.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(status, fh)
+    os.replace(tmp, _path(job_id, "json"))
+    return status
+
+
+def read_status(job_id):
+    try:
+        with open(_path(job_id, "json")) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _alive(pid) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError, ValueError):
+        pass
+    return True
+
+
+def _orphaned(job_id, st):
+    """Why a queued/running job can no longer finish (its process is gone), or None."""
+    state = st.get("state")
+    local = st.get("host") == _HOST
+    if state == "running":
+        if local and st.get("pid") and not _alive(st["pid"]):
+            return "job process exited"
+        try:
+            beat = os.path.getmtime(_path(job_id, "beat"))
+        except OSError:
+            beat = st.get("started") or st.get("updated") or 0
+        if time.time() - beat > JOB_STALE:
+            return f"no heartbeat for {JOB_STALE:.0f}s"
+    elif state == "queued" and local and st.get("owner") and not _alive(st["owner"]):
+        return "submitting process exited"
+    return None
+
+
+def _checked_status(job_id):
+    """read_status(), with orphaned queued/running jobs marked failed."""
+    st = read_status(job_id)
+    if st is None or st.get("state") in FINAL_STATES:
+        return st
+    reason = _orphaned(job_id, st)
+    if reason is None:
+        return st
+    print(f"[jobs] job {job_id} orphaned: {reason}")
+    return _write_status(job_id, state="failed", error=f"orphaned: {reason}", finished=time.time())
+
+
+class JobContext:
+    """Handed to every task as its first argument (picklable)."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def output_path(self, suffix: str) -> str:
+        """Where a task should write a file result, e.g. ctx.output_path('export.csv')."""
+        return os.path.join(JOB_DIR, f"{self.job_id}-{suffix}")
+
+    def cancelled(self) -> bool:
+        return os.path.exists(_path(self.job_id, "cancel"))
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled(self.job_id)
+
+    def progress(self, done, total=None, message=""):
+        _write_status(self.job_id, done=done, total=total, message=message)
+        self.check_cancelled()
+
+
+def _heartbeat(job_id, stop):
+    beat = _path(job_id, "beat")
+    while True:
+        try:
+            with open(beat, "a"):
+                os.utime(beat)
+        except OSError:
+            pass
+        if stop.wait(JOB_HEARTBEAT):
+            return
+
+
+def _run(fn, job_id, args):
+    """Executed in the pool process."""
+    ctx = JobContext(job_id)
+    stop = threading.Event()
+    try:
+        ctx.check_cancelled()
+        threading.Thread(target=_heartbeat, args=(job_id, stop), daemon=True).start()
+        _write_status(job_id, state="running", started=time.time(), pid=os.getpid(), host=_HOST)
+        result = fn(ctx, *args)
+        with open(_path(job_id, "pkl.tmp"), "wb") as fh:
+            pickle.dump(result, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(_path(job_id, "pkl.tmp"), _path(job_id, "pkl"))
+        _write_status(job_id, state="done", finished=time.time())
+    except JobCancelled:
+        _write_status(job_id, state="cancelled", finished=time.time())
+    except Exception as e:
+        print(f"[jobs._run] job {job_id} failed: {e}")
+        _write_status(job_id, state="failed", error=str(e), traceback=traceback.format_exc(), finished=time.time())
+    finally:
+        stop.set()
+
+
+# -----------------------------------------
+# Public API
+# -----------------------------------------
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            os.makedirs(JOB_DIR, exist_ok=True)
+            # spawn: forking a multi-threaded gunicorn worker is not safe
+            _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _on_future_done(job_id, fut):
+    """The pool itself failed (e.g. a pool process was killed): the task never finalized the job."""
+    global _executor
+    if fut.cancelled() or fut.exception() is None:
+        return
+    exc = fut.exception()
+    st = read_status(job_id)
+    if st and st.get("state") not in FINAL_STATES:
+        _write_status(job_id, state="failed", error=f"{type(exc).__name__}: {exc}", finished=time.time())
+    if isinstance(exc, BrokenProcessPool):
+        with _executor_lock:
+            _executor = None  # the next submit() starts a new pool
+
+
+def sweep(max_age: float = JOB_TTL):
+    """Remove the files of jobs that finished more than `max_age` seconds ago, and keys left pointing at them."""
+    now = time.time()
+    try:
+        names = os.listdir(JOB_DIR)
+    except OSError:
+        return
+    expired = set()
+    for name in names:
+        if name.endswith(".json"):
+            job_id = name[:-5]
+            st = _checked_status(job_id)
+            if st and st.get("state") in FINAL_STATES and now - st.get("updated", now) > max_age:
+                expired.add(job_id)
+    for name in names:
+        job_id = name.split(".", 1)[0].split("-", 1)[0]
+        path = os.path.join(JOB_DIR, name)
+        try:
+            if job_id in expired:
+                os.remove(path)
+            elif name.endswith(".key"):
+                with open(path) as fh:
+                    if fh.read().strip() in expired:
+                        os.remove(path)
+        except OSError:
+            pass
+    if expired:
+        print(f"[jobs.sweep] removed {len(expired)} jobs older than {max_age / 86400:g} days")
+
+
+def job_key(name, *args) -> str:
+    return hashlib.blake2b(repr((name,) + args).encode(), digest_size=12).hexdigest()
+
+
+def submit(name: str, fn, *args, key: str = None) -> str:
+    """
+    Queue fn(ctx, *args) and return its job id. If a job with the same key already
+    finished (or is still queued/running) that job's id is returned instead.
+    """
+    key = key or job_key(name, fn.__module__, fn.__name__, *args)
+    os.makedirs(JOB_DIR, exist_ok=True)
+    if time.time() - _last_sweep[0] > SWEEP_INTERVAL:
+        _last_sweep[0] = time.time()
+        sweep()
+    try:
+        with open(_path(key, "key")) as fh:
+            previous = fh.read().strip()
+        st = _checked_status(previous)
+        if st and (st.get("state") not in FINAL_STATES or
+                   (st.get("state") == "done" and os.path.exists(_path(previous, "pkl")))):
+            return previous
+    except OSError:
+        pass
+
+    job_id = uuid.uuid4().hex[:16]
+    _write_status(job_id, name=name, key=key, state="queued", submitted=time.time(), done=0, total=None, message="",
+                  owner=os.getpid(), host=_HOST)
+    with open(_path(key, "key"), "w") as fh:
+        fh.write(job_id)
+    for jid in [j for j, f in _futures.items() if f.done()]:
+        _futures.pop(jid, None)
+    _futures[job_id] = fut = _get_executor().submit(_run, fn, job_id, args)
+    fut.add_done_callback(lambda f, jid=job_id: _on_future_done(jid, f))
+    return job_id
+
+
+def status(job_id) -> dict:
+    st = _checked_status(job_id)
+    if st is None:
+        return {"id": job_id, "state": "unknown"}
+    st.pop("traceback", None)
+    return st
+
+
+def result(job_id):
+    """Unpickled result of a finished job, or None."""
+    try:
+        with open(_path(job_id, "pkl"), "rb") as fh:
+            return pickle.load(fh)
+    except OSError:
+        return None
+
+
+def cancel(job_id) -> bool:
+    st = read_status(job_id)
+    if st is None or st.get("state") in FINAL_STATES:
+        return False
+    if _orphaned(job_id, st):
+        # nothing is left to see the marker
+        _write_status(job_id, state="cancelled", finished=time.time())
+        return True
+    open(_path(job_id, "cancel"), "w").close()
+    fut = _futures.get(job_id)
+    if fut is not None and fut.cancel():
+        # never started; the pool process will not update the status itself
+        _write_status(job_id, state="cancelled", finished=time.time())
+    return True
+
+
+# -----------------------------------------
+# Result download
+# -----------------------------------------
+jobs_bp = Blueprint("jobs", __name__)
+
+
+@jobs_bp.route("/<job_id>")
+def job_status(job_id):
+    return jsonify(status(job_id))
+
+
+@jobs_bp.route("/<job_id>/result")
+def job_result(job_id):
+    """File results (exports, reports) are sent as attachments."""
+    if not job_id.isalnum() or status(job_id).get("state") != "done":
+        abort(404)
+    res = result(job_id)
+    if isinstance(res, str) and os.path.isfile(res):
+        return send_file(os.path.abspath(res), as_attachment=True)
+    abort(404)
+
+
+def init_jobs(server):
+    """Register the jobs blueprint with the Flask server."""
+    server.register_blueprint(jobs_bp, url_prefix="/jobs")
@@ -51,7 +51,7 @@ def header():
         
         html.Div([
             
-            html.Button("Export Storyboard as PDF", id="btn-print",
+            html.Button("Export report", id="btn-print",
                         style={
                             'background': '#2dd4bf',
                             'color': '#042024',
@@ -59,8 +59,14 @@ def header():
                             'padding': '8px 12px',
                             'borderRadius': '8px'
                         }),
-                        
-        
+            # server-side report (app/reports.py) for the current filters
+            dcc.Download(id='download-report'),
+            # filtered rows, streamed by app/export.py (hrefs follow the filters)
+            html.A("CSV", id='export-csv', href='/export/occurrences.csv',
+                   style={'color': '#2dd4bf', 'fontSize': '12px', 'marginLeft': '12px'}),
+            html.A("Parquet", id='export-parquet', href='/export/occurrences.parquet',
+                   style={'color': '#2dd4bf', 'fontSize': '12px', 'marginLeft': '8px'}),
+
             html.Div(
                 f"Last refresh: {datetime.today().strftime('%d-%m-%Y')}",
                      style={'fontSize': '12px', 'color': '#94a3b8',
@@ -76,6 +82,7 @@ def nav():
             html.Button("Detail", id="nav-detail"),
             html.Button("Recommendations", id="nav-recs"),
             html.Button("Storyboard", id="nav-story"),
+            html.Button("Jobs", id="nav-jobs"),
         ])
     ])
 
@@ -102,6 +109,20 @@ def filters_bar():
         'overflowX': 'visible'
     }, children=[
 
+        # DATASET (registry in app/datasets.py; options filled by a callback)
+        html.Div(style=base_style, children=[
+            dcc.Dropdown(
+                id='dataset-filter',
+                options=[],
+                value='default',
+                placeholder='Dataset',
+                clearable=False,
+                persistence=True,
+                persistence_type='session',
+                style={'background': 'transparent', 'border': 'none', 'width': '100%'}
+            )
+        ]),
+
         # SEARCH INPUT
         html.Div(style={**base_style, 'flex': '1', 'minWidth': '260px'}, children=[
             dcc.Input(
@@ -180,6 +201,18 @@ def filters_bar():
                 display_format='MMMM YYYY',
                 clearable=True,
                 
+                style={'background': 'transparent', 'border': 'none'}
+            )
+        ]),
+
+        # DATE RANGE (any window; combined with the month above)
+        html.Div(style={**base_style, 'minWidth': '240px'}, children=[
+            dcc.DatePickerRange(
+                id='date-range',
+                start_date_placeholder_text='From',
+                end_date_placeholder_text='To',
+                display_format='DD MMM YYYY',
+                clearable=True,
                 style={'background': 'transparent', 'border': 'none'}
             )
         ])
@@ -189,6 +222,7 @@ def filters_bar():
 
 def get_layout():
     return html.Div(style=APP_STYLE, children=[
+        dcc.Location(id='url', refresh=False),  # ?sn=<S/N> addresses a detail page
         header(),
         nav(),
         filters_bar(),
@@ -202,7 +236,12 @@ def get_layout():
                 'aircraft': 'All',
                 'phase': 'All',
                 'status': 'All',
-                'month': ''
+                'month': '',
+                'date_from': '',
+                'date_to': '',
+                'dataset': 'default'
             }
-        )
+        ),
+        # background job ids started from this browser session (see app/jobs.py)
+        dcc.Store(id='job-ids', storage_type='session', data=[])
     ])
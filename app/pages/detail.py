@@ -1,22 +1,42 @@
 # app/pages/detail.py
-from dash import html, dash_table
+from dash import html, dcc, dash_table
 import pandas as pd
 
-def render_detail(df: pd.DataFrame):
-    if df is None or df.empty or 'S/N' not in df.columns:
+from ..atr import tracker, STATUS_LABELS, RECEIVED, CLOSED
+from ..utils import get_record, INCIDENT_AIRPORT_COL
+
+
+def render_detail(df: pd.DataFrame, sn=None):
+    """
+    Detail for one occurrence. With `sn` (from ?sn=<S/N> or a table row click) the record
+    is looked up in the S/N index of the full register (an unknown S/N shows a not-found
+    message); without one, the first row of the filtered frame is shown.
+    """
+    if sn not in (None, ''):
+        row = get_record(sn)
+        if row is None:
+            return html.Div([html.Button('Back to dashboard', id='back-dashboard'), html.P(f"No occurrence with S/N {sn}.")])
+    elif df is None or df.empty or 'S/N' not in df.columns:
         return html.Div([html.Button('Back to dashboard', id='back-dashboard'), html.P("No detail available (data missing).")])
-    if 1254 not in df['S/N'].values:
-        row = df.iloc[0].to_dict()
     else:
-        row = df[df['S/N']==1254].iloc[0].to_dict()
+        row = df.iloc[0].to_dict()
+    atr_code = tracker().status_of(row.get('S/N'))
+    atr_status = STATUS_LABELS.get(atr_code) or row.get('ATR of Recommendations', '')
     return html.Div(children=[
+        dcc.Store(id='detail-sn', data=str(row.get('S/N', ''))),
         html.Button('Back to dashboard', id='back-dashboard'),
         html.H2(f"Investigation detail — S/N {row.get('S/N', '')}"),
-        html.Div(f"Date: {row.get('Date', '')} | Airport: {row.get('Airport', '')} | Operator: {row.get('Operator', '')}"),
+        html.Div(f"Date: {row.get('Date', '')} | Airport: {row.get(INCIDENT_AIRPORT_COL, row.get('Airport', ''))} | Operator: {row.get('Operator', '')}"),
         html.H3('Brief description'), html.P(row.get('Brief Description', '')),
         html.H3('Findings'), html.Ul([html.Li(item.strip()) for item in str(row.get('Findings','')).split(';') if item]),
         html.H3('Probable cause'), html.P(row.get('Probable Cause', '')),
         html.Div(style={'padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px','marginTop':'12px'}, children=[
-            html.H4('Recommendations'), html.P(row.get('Recommendations','')), html.Div('ATR status: {}'.format(row.get('ATR of Recommendations',''))), html.Button('Upload ATR', id='btn-upload-atr')
+            html.H4('Recommendations'), html.P(row.get('Recommendations','')), html.Div('ATR status: {}'.format(atr_status), id='atr-status'),
+            html.Div(style={'display':'flex','gap':'10px','alignItems':'center','marginTop':'8px'}, children=[
+                dcc.Dropdown(id='atr-status-input', options=[{'label': STATUS_LABELS[c], 'value': c} for c in (RECEIVED, CLOSED)],
+                             value=RECEIVED, clearable=False, style={'minWidth':'140px','color':'#042024'}),
+                dcc.DatePickerSingle(id='atr-date-input', placeholder='ATR date'),
+                html.Button('Upload ATR', id='btn-upload-atr'),
+            ])
         ])
     ])
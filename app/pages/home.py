@@ -5,45 +5,73 @@ import plotly.express as px
 import pandas as pd
 from typing import Optional
 
-from ..components.map import build_map_component
+from ..anomaly import recent_anomalies, describe as describe_anomaly, RECENT_MONTHS
+from ..atr import dashboard_summary
+from ..cache import cached_figure
+from ..concurrency import parallel
+from ..rates import has_exposure, monthly_table, rates_by, PER
+from ..spatial import state_index
+from ..utils import date_slice, equals_ci
+from ..components.map import build_map_component, build_state_map_component
 from .detail import render_detail as render_detail
 from .recommendations import render_recommendations as render_recommendations
 from .storyboard import render_storyboard as render_storyboard
 
-def render_dashboard(df: Optional[pd.DataFrame]):
-    if df is None:
-        df = pd.DataFrame()
+def _build_rate_figures(df: pd.DataFrame, store: Optional[dict]):
+    table = monthly_table(df, store)
+    fig_trend = cached_figure('trend-rate', table[['Date', 'rate']],
+                              lambda d: px.line(d, x='Date', y='rate', title=f'Occurrences per {PER:,} movements',
+                                                labels={'rate': f'per {PER:,} movements'}))
+    today = pd.Timestamp.now()
+    start = pd.Timestamp(year=today.year - 2, month=today.month, day=1)
+    end = pd.Timestamp(year=today.year, month=today.month, day=1) + MonthEnd(0)
+    month_index = pd.date_range(start=start + MonthEnd(0), end=end, freq='ME')
+    window = table.set_index('Date')['rate'].reindex(month_index).rename_axis('Date').reset_index()
+
+    def build_month(d):
+        fig = px.bar(d, x='Date', y='rate',
+                     title=f"Occurrences per {PER:,} movements {start.strftime('%b %Y')} to {end.strftime('%b %Y')}",
+                     labels={'rate': f'per {PER:,} movements', 'Date': 'Month'}, height=440)
+        fig.update_xaxes(tickformat='%b\n%Y', tickangle=0)
+        fig.update_layout(margin={'l': 20, 'r': 10, 't': 36, 'b': 30})
+        return fig
+
+    return cached_figure('month-rate', window, build_month), fig_trend
+
+
+def build_figures(df: pd.DataFrame, metric: str = 'count', store: Optional[dict] = None):
+    """Return (fig_month, fig_trend) for the filtered frame; metric='rate' plots per-10k-movement rates."""
+    if metric == 'rate' and has_exposure() and not df.empty:
+        return _build_rate_figures(df, store)
+
+    # the two figures are independent; built concurrently on the shared render pool
+    figs = parallel(month=lambda: _month_figure(df), trend=lambda: _trend_figure(df))
+    return figs['month'], figs['trend']
 
-    total = len(df)
-    open_count = df[df['Status'].str.lower() == 'open'].shape[0] if 'Status' in df.columns else 0
-    recs_outstanding = df[df['ATR of Recommendations'].str.lower().isin(['pending'])].shape[0] if 'ATR of Recommendations' in df.columns else 0
-    avg_close = '42 days'
-    
-    if not df.empty and 'Date' in df.columns:
-        df_monthly = df.groupby(pd.Grouper(key='Date', freq='ME')).size().reset_index(name='count')
-        fig_trend = px.line(df_monthly, x='Date', y='count', title='Open investigations trend')
-    else:
-        fig_trend = {}
-        
-    # ----- Occurrences by Month -----
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-    else:
-        df['Date'] = pd.NaT
 
+def _trend_figure(df: pd.DataFrame):
+    if df.empty or 'Date' not in df.columns:
+        return {}
+    df_monthly = df.groupby(pd.Grouper(key='Date', freq='ME')).size().reset_index(name='count')
+    return cached_figure('trend', df_monthly,
+                         lambda d: px.line(d, x='Date', y='count', title='Open investigations trend'))
+
+
+def _month_figure(df: pd.DataFrame):
+    # ----- Occurrences by Month -----
     today = pd.Timestamp.now()
     start = pd.Timestamp(year=today.year - 2, month=today.month, day=1)
     end = pd.Timestamp(year=today.year, month=today.month, day=1) + MonthEnd(0)
 
-# filter rows inside window
-    if not df.empty and df['Date'].notna().any():
-        df_window = df[(df['Date'] >= start) & (df['Date'] <= end)].copy()
+    # rows inside the window: a binary-search slice of the date-sorted view (utils.date_slice)
+    if 'Date' in df.columns and not df.empty:
+        df_window = date_slice(df, start, end + pd.Timedelta(days=1))[['Date']]
     else:
-        df_window = df.iloc[0:0].copy()
-    
+        df_window = pd.DataFrame({'Date': pd.Series(dtype='datetime64[ns]')})
+
     month_index = pd.date_range(start=start + MonthEnd(0), end=end, freq='ME')  # month-end points
     if not df_window.empty:
-    # resample by month-end (so the x axis shows months)
+        # resample by month-end (so the x axis shows months)
         monthly = df_window.set_index('Date').resample('ME').size().reindex(month_index, fill_value=0)
     else:
         monthly = pd.Series(0, index=month_index)
@@ -51,39 +79,153 @@ def render_dashboard(df: Optional[pd.DataFrame]):
     df_monthly = monthly.reset_index()
     df_monthly.columns = ['Date', 'count']
 
-# build bar chart
-    fig_month = px.bar(
-        df_monthly,
-        x='Date',
-        y='count',
-        title=f"Occurrences {start.strftime('%b %Y')} to {end.strftime('%b %Y')}",
-        labels={'count': 'Occurrences', 'Date': 'Month'},
-        height=440  # increase height (px) — change this value to taste
-    )
+    # build bar chart
+    def build_month(d):
+        fig = px.bar(
+            d,
+            x='Date',
+            y='count',
+            title=f"Occurrences {start.strftime('%b %Y')} to {end.strftime('%b %Y')}",
+            labels={'count': 'Occurrences', 'Date': 'Month'},
+            height=440  # increase height (px) — change this value to taste
+        )
+        # tidy x-axis formatting: show month and year, rotate ticks if crowded
+        fig.update_xaxes(tickformat='%b\n%Y', tickangle=0)
+        fig.update_layout(margin={'l': 20, 'r': 10, 't': 36, 'b': 30})
+        return fig
+
+    return cached_figure('month', df_monthly, build_month)
+
+
+def render_charts(df: Optional[pd.DataFrame], metric: str = 'count', store: Optional[dict] = None):
+    """Children of the right-hand chart column (month bars + trend line)."""
+    if df is None:
+        df = pd.DataFrame()
+    fig_month, fig_trend = build_figures(df, metric, store)
+    return [
+        html.Div(
+            dcc.Graph(figure=fig_month, style={'height': '100%'}),
+            style={
+                'padding': '2px',
+                'background': 'rgba(255,255,255,0.02)',
+                'borderRadius': '0px',
+
+                'flex': '1 1 440px',
+                'minWidth': '0',
+            }
+        ),
+        html.Div(
+            dcc.Graph(figure=fig_trend, style={'height': '100%'}),
+            style={
+                'padding': '2px',
+                'background': 'rgba(255,255,255,0.02)',
+                'borderRadius': '0px',
+                'flex': '1 1 440%',
+                'minWidth': '0',
+            }
+        )
+    ]
+
+
+def render_map(df: Optional[pd.DataFrame], mode: str = 'points'):
+    if mode == 'states':
+        return build_state_map_component(df)
+    return build_map_component(df if df is not None else pd.DataFrame())
+
+
+def _top(df: pd.DataFrame, col: str, n: int = 6) -> list:
+    if col not in df.columns:
+        return []
+    counts = df[col].value_counts()
+    # categorical columns also count the categories absent from the filtered view
+    return list(counts[counts > 0].head(n).items())
+
+
+def _format_days(value):
+    return f"{value:.0f} days" if value is not None else '—'
+
 
-# tidy x-axis formatting: show month and year, rotate ticks if crowded
-    fig_month.update_xaxes(tickformat='%b\n%Y', tickangle=0)
-    fig_month.update_layout(margin={'l': 20, 'r': 10, 't': 36, 'b': 30})
+def _rate_suffix(rates: pd.Series, key) -> str:
+    rate = rates.get(str(key)) if not rates.empty else None
+    return f" ({rate:.2f} per {PER:,} mvts)" if rate is not None and pd.notna(rate) else ''
+
+
+def render_dashboard(df: Optional[pd.DataFrame], lazy: bool = True, store: Optional[dict] = None):
+    """
+    KPI cards, top lists and the table are built here. With lazy=True the map and the
+    chart column are only placeholders ('dash-map' / 'dash-charts'); callbacks.py fills
+    them in follow-up callbacks so the cards appear without waiting for the map.
+    """
+    if df is None:
+        df = pd.DataFrame()
 
     table_columns = ['S/N', 'Date', 'Airport / Place of occurrence', 'Operator', 'Aircraft Type', 'Phase of flight', 'Status']
+
+    # independent parts over the same filtered frame, computed concurrently (app/concurrency.py)
+    tasks = dict(
+        open_count=lambda: int(equals_ci(df['Status'], 'open').sum()) if 'Status' in df.columns else 0,
+        atr_stats=lambda: dashboard_summary(df, store),
+        flags=lambda: recent_anomalies(store),
+        op_rates=lambda: rates_by(df, 'Operator', store),
+        ap_rates=lambda: rates_by(df, 'Airport / Place of occurrence', store),
+        top_ops=lambda: _top(df, 'Operator'),
+        top_aps=lambda: _top(df, 'Airport / Place of occurrence'),
+        # 'id' = S/N so a clicked cell's row_id opens /?sn=<S/N>
+        records=lambda: df[table_columns].assign(id=df['S/N']).to_dict('records') if not df.empty and set(table_columns).issubset(df.columns) else [],
+    )
+    if not lazy:
+        tasks.update(map=lambda: render_map(df), charts=lambda: render_charts(df))
+    parts = parallel(**tasks)
+
+    total = len(df)
+    open_count = parts['open_count']
+    atr_stats = parts['atr_stats']
+    recs_outstanding = atr_stats['pending']
+    avg_close = _format_days(atr_stats['avg_days'])
+    flags = parts['flags']
+    op_rates, ap_rates = parts['op_rates'], parts['ap_rates']
+    close_spread = f"p50 {_format_days(atr_stats['p50_days'])} · p90 {_format_days(atr_stats['p90_days'])}" if atr_stats['closed'] else 'no closed ATRs with dates'
+
     table = dash_table.DataTable(
         id='table-occ',
         columns=[{'name': c, 'id': c} for c in table_columns],
-        data=(df[table_columns].to_dict('records') if not df.empty and set(table_columns).issubset(df.columns) else []),
+        data=parts['records'],
         page_size=8,
         style_table={'overflowX': 'auto'},
         style_cell_conditional=[{'if': {'column_id': 'S/N'}, 'width': '60px'}]
     )
 
-    map_component = build_map_component(df)
+    # counts vs rates for the chart column (rates need the exposure table, see app/rates.py)
+    metric_toggle = dcc.RadioItems(
+        id='metric-toggle',
+        options=[{'label': 'Counts', 'value': 'count'},
+                 {'label': f'Per {PER:,} movements', 'value': 'rate', 'disabled': not has_exposure()}],
+        value='count', inline=True, persistence=True,
+        inputStyle={'marginRight': '4px'}, labelStyle={'marginRight': '12px', 'fontSize': '12px'},
+    )
+
+    # occurrence points vs occurrences per state (state boundaries from app/spatial.py)
+    map_toggle = dcc.RadioItems(
+        id='map-mode',
+        options=[{'label': 'Occurrences', 'value': 'points'},
+                 {'label': 'By state', 'value': 'states', 'disabled': state_index() is None}],
+        value='points', inline=True, persistence=True,
+        inputStyle={'marginRight': '4px'}, labelStyle={'marginRight': '12px', 'fontSize': '12px'},
+    )
 
+    if lazy:
+        map_component = dcc.Loading(html.Div(id='dash-map', style={'height': '880px'}), type='circle')
+        chart_children = dcc.Loading(html.Div(id='dash-charts', style={'display': 'flex', 'flexDirection': 'column', 'gap': '12px', 'height': '880px'}), type='circle')
+    else:
+        map_component = parts['map']
+        chart_children = parts['charts']
 
     return html.Div(children=[
         html.Div(style={'display':'flex','gap':'12px','marginTop':'6px','marginBottom':'12px'}, children=[
             html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.Div('Total occurrences', style={'fontSize':'14px'}), html.Div(total, style={'fontSize':'22px','fontWeight':'600'}), html.Div('(last 12 months)', style={'fontSize':'12px','color':'#94a3b8'})]),
             html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.Div('Open investigations', style={'fontSize':'14px'}), html.Div(open_count, style={'fontSize':'22px','fontWeight':'600'})]),
             html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.Div('Recommendations outstanding', style={'fontSize':'14px'}), html.Div(recs_outstanding, style={'fontSize':'22px','fontWeight':'600'})]),
-            html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.Div('Avg days to close', style={'fontSize':'14px'}), html.Div(avg_close, style={'fontSize':'22px','fontWeight':'600'})]),
+            html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.Div('Avg days to close', style={'fontSize':'14px'}), html.Div(avg_close, style={'fontSize':'22px','fontWeight':'600'}), html.Div(close_spread, style={'fontSize':'12px','color':'#94a3b8'})]),
         ]),
         
         # ----- MAP + RIGHT PANE (replace your existing block) -----
@@ -108,6 +250,7 @@ def render_dashboard(df: Optional[pd.DataFrame]):
                         'height': '100%'  # <-- increase if you want larger map by default,
                     },
                     children=[
+                        map_toggle,
                         # map wrapper that fills the column. minHeight keeps it visible.
                         html.Div(
                             map_component,
@@ -132,37 +275,16 @@ def render_dashboard(df: Optional[pd.DataFrame]):
                         'minWidth': '0',
                         'height': '880px',
                     },
-                    children=[
-                        html.Div(
-                            dcc.Graph(figure=fig_month, style={'height': '100%'}),
-                            style={
-                                'padding': '2px',
-                                'background': 'rgba(255,255,255,0.02)',
-                                'borderRadius': '0px',
-                                
-                                'flex': '1 1 440px',
-                                'minWidth': '0',
-                            }
-                        ),
-                        html.Div(
-                            dcc.Graph(figure=fig_trend, style={'height': '100%'}),
-                            style={
-                                'padding': '2px',
-                                'background': 'rgba(255,255,255,0.02)',
-                                'borderRadius': '0px',
-                                'flex': '1 1 440%',
-                                'minWidth': '0',
-                            }
-                        )
-                    ]
+                    children=[metric_toggle] + (chart_children if isinstance(chart_children, list) else [chart_children])
                 )
             ]
         ),
 
 
         html.Div(style={'marginTop':'12px','display':'flex','gap':'12px'}, children=[
-            html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.H4('Top Operators'), html.Ul([html.Li(f"{op} — {cnt}") for op,cnt in (df['Operator'].value_counts().head(6).items() if 'Operator' in df.columns else [])])]),
-            html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.H4('Top Airports'), html.Ul([html.Li(f"{ap} — {cnt}") for ap,cnt in (df['Airport / Place of occurrence'].value_counts().head(6).items() if 'Airport / Place of occurrence' in df.columns else [])])]),
+            html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.H4('Top Operators'), html.Ul([html.Li(f"{op} — {cnt}{_rate_suffix(op_rates, op)}") for op,cnt in parts['top_ops']])]),
+            html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.H4('Top Airports'), html.Ul([html.Li(f"{ap} — {cnt}{_rate_suffix(ap_rates, ap)}") for ap,cnt in parts['top_aps']])]),
+            html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.H4(f'Anomalies (last {RECENT_MONTHS} months)'), html.Ul([html.Li(describe_anomaly(r)) for _, r in flags.iterrows()]) if not flags.empty else html.Div('No unusual occurrence rates.', style={'color':'#94a3b8'})]),
             html.Div(style={'flex':'1','padding':'12px','background':'rgba(255,255,255,0.02)','borderRadius':'8px'}, children=[html.H4('Recommendations Board'), html.Div('ATR pending: {}'.format(recs_outstanding)), html.Button('View Recommendations', id='btn-view-recs')])
         ]),
 
@@ -170,4 +292,4 @@ def render_dashboard(df: Optional[pd.DataFrame]):
     ])
 
 # re-export convenience names for callbacks
-__all__ = ["render_dashboard", "render_detail", "render_recommendations", "render_storyboard"]
+__all__ = ["render_dashboard", "render_charts", "render_map", "render_detail", "render_recommendations", "render_storyboard"]
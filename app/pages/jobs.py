@@ -0,0 +1,45 @@
+# app/pages/jobs.py
+from dash import html, dcc
+
+from .. import jobs
+
+CARD_STYLE = {'padding': '12px', 'background': 'rgba(255,255,255,0.02)', 'borderRadius': '8px', 'marginTop': '12px'}
+
+
+def render_jobs(_df=None):
+    """Start/monitor background jobs; the list is refreshed by the 'job-poll' interval."""
+    return html.Div(children=[
+        html.H2('Background jobs'),
+        html.P('Heavy analytics run in a separate process pool; you can keep using the dashboard meanwhile.',
+               style={'color': '#94a3b8'}),
+        html.Div(style={'display': 'flex', 'gap': '10px'}, children=[
+            html.Button('Geocode full register', id='btn-job-geocode'),
+            html.Button('Recompute multi-year trends', id='btn-job-trends'),
+            html.Button('Export filtered rows (CSV)', id='btn-job-export'),
+            html.Button('Per-operator reports', id='btn-job-reports-operator'),
+            html.Button('Per-airport reports', id='btn-job-reports-airport'),
+        ]),
+        dcc.Interval(id='job-poll', interval=1000),
+        html.Div(id='job-cancel-ack', style={'color': '#94a3b8', 'fontSize': '12px'}),
+        html.Div(id='job-list', style=CARD_STYLE),
+    ])
+
+
+def render_job_list(job_ids):
+    rows = []
+    for job_id in reversed(job_ids or []):
+        st = jobs.status(job_id)
+        state = st.get('state', 'unknown')
+        done, total = st.get('done') or 0, st.get('total')
+        actions = []
+        if state not in jobs.FINAL_STATES and state != 'unknown':
+            actions.append(html.Button('Cancel', id={'type': 'job-cancel', 'index': job_id}))
+        if state == 'done':
+            actions.append(html.A('Download result', href=f'/jobs/{job_id}/result'))
+        rows.append(html.Div(style={'display': 'flex', 'gap': '12px', 'alignItems': 'center', 'padding': '4px 0'}, children=[
+            html.Div(st.get('name', job_id), style={'minWidth': '220px'}),
+            html.Progress(value=str(done), max=str(total or 1), style={'width': '200px'}),
+            html.Div(f"{state} {st.get('message') or ''} {st.get('error') or ''}".strip(), style={'color': '#94a3b8', 'fontSize': '12px'}),
+            *actions,
+        ]))
+    return rows or [html.Div('No jobs started in this session.', style={'color': '#94a3b8'})]
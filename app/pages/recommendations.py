@@ -2,11 +2,15 @@
 from dash import html, dash_table
 import pandas as pd
 
+from ..atr import tracker, PENDING, STATUS_LABELS
+
 def render_recommendations(df: pd.DataFrame):
     if df is None or df.empty:
         pending = pd.DataFrame()
     else:
-        pending = df[df['ATR of Recommendations'].str.lower()=='pending'] if ('ATR of Recommendations' in df.columns) else df.iloc[0:0]
+        # normalized ATR codes from the tracker (includes ATRs recorded since load)
+        codes = tracker().codes_for(df)
+        pending = df[codes == PENDING].assign(**{'ATR of Recommendations': STATUS_LABELS[PENDING]})
     return html.Div(children=[
         html.H2('Recommendations Board'), html.Div(f'Pending: {len(pending)}'),
         dash_table.DataTable(columns=[{'name':c,'id':c} for c in ['S/N','Recommendations','ATR of Recommendations','Status']],
@@ -0,0 +1,141 @@
+# app/rates.py
+"""
+Occurrence rates per 10k movements using the exposure table (utils.load_exposure).
+
+- The exposure table is read once per file version; per-scope movement totals are
+  grouped once and cached.
+- monthly_table() joins the monthly incident counts of a filtered view with the movements
+  of the same scope (airport/operator filter) on the month index and keeps count, movements
+  and rate side by side. It is cached per (data version, filters, exposure version), so
+  switching the dashboard between counts and rates only changes which column is drawn.
+"""
+
+import json
+import os
+import threading
+
+import pandas as pd
+
+from . import utils
+from .cache import LRUCache
+from .datasets import on_dataset_evicted
+from .utils import data_version, load_exposure, INCIDENT_AIRPORT_COL
+
+PER = 10000
+
+_EXPOSURE = {}
+_EXPOSURE_LOCK = threading.Lock()
+_SCOPED = LRUCache(128)
+_TABLES = LRUCache(64)
+_RATES_BY = LRUCache(64)
+
+
+@on_dataset_evicted
+def _drop_dataset(path):
+    # tables keyed by data_version() of a dataset that left the dataset cache
+    for cache in (_TABLES, _RATES_BY):
+        cache.discard_where(lambda key: key[0][0] == path)
+
+
+def exposure_version():
+    p = utils.EXPOSURE_PATH
+    try:
+        st = os.stat(p)
+        return (p, st.st_mtime_ns, st.st_size)
+    except (OSError, TypeError):
+        return (p, None, None)
+
+
+def exposure() -> pd.DataFrame:
+    version = exposure_version()
+    with _EXPOSURE_LOCK:
+        cached = _EXPOSURE.get('frame')
+        if cached is None or cached[0] != version:
+            cached = (version, load_exposure() if version[1] is not None else pd.DataFrame())
+            _EXPOSURE['frame'] = cached
+        return cached[1]
+
+
+def has_exposure() -> bool:
+    return not exposure().empty
+
+
+def _scope_filters(store):
+    s = store or {}
+    return {col: s.get(key) for key, col in (('airport', INCIDENT_AIRPORT_COL), ('operator', 'Operator'))
+            if s.get(key) not in (None, '', 'All')}
+
+
+def exposure_by(store, by: str = 'Month'):
+    """
+    Movements summed by `by` within the airport/operator scope of the filter store,
+    or None when the exposure table cannot be scoped that way (e.g. an operator filter
+    against airport-only movements).
+    """
+    ex = exposure()
+    if ex.empty or by not in ex.columns:
+        return None
+    filters = _scope_filters(store)
+    key = (exposure_version(), by, tuple(sorted(filters.items())))
+    hit = _SCOPED.get(key)
+    if hit is not None:
+        return hit
+    if any(col not in ex.columns for col in filters):
+        return None
+    mask = pd.Series(True, index=ex.index)
+    for col, val in filters.items():
+        mask &= ex[col] == str(val)
+    result = ex.loc[mask].groupby(by, observed=True)['Movements'].sum()
+    _SCOPED.set(key, result)
+    return result
+
+
+def monthly_table(df: pd.DataFrame, store: dict = None) -> pd.DataFrame:
+    """
+    Month-end Date, count, movements and rate (per 10k movements) for the filtered view.
+    `df` must be the frame filtered by `store` (callbacks.filtered_data(store)).
+    """
+    key = (data_version(), exposure_version(), json.dumps(store or {}, sort_keys=True, default=str))
+    hit = _TABLES.get(key)
+    if hit is not None:
+        return hit
+
+    dates = pd.to_datetime(df['Date'], errors='coerce') if df is not None and 'Date' in df.columns else pd.Series(dtype='datetime64[ns]')
+    counts = dates.dropna().dt.to_period('M').value_counts().rename('count')
+    movements = exposure_by(store)
+    if movements is None:
+        table = counts.to_frame().assign(movements=float('nan'))
+    else:
+        # keyed join on the month index; months with movements but no occurrences count as 0
+        table = counts.to_frame().join(movements.rename('movements'), how='outer')
+        table['count'] = table['count'].fillna(0)
+    table = table.sort_index()
+    table['rate'] = table['count'] / table['movements'] * PER
+    table.index = table.index.to_timestamp(how='end').normalize()
+    table = table.rename_axis('Date').reset_index()
+    _TABLES.set(key, table)
+    return table
+
+
+def rates_by(df: pd.DataFrame, col: str, store: dict = None) -> pd.Series:
+    """Occurrences per 10k movements by airport/operator over the months the view covers."""
+    ex = exposure()
+    if ex.empty or col not in ex.columns or df is None or df.empty or col not in df.columns:
+        return pd.Series(dtype=float)
+    key = (data_version(), exposure_version(), col, json.dumps(store or {}, sort_keys=True, default=str))
+    hit = _RATES_BY.get(key)
+    if hit is not None:
+        return hit
+    months = pd.to_datetime(df['Date'], errors='coerce').dropna().dt.to_period('M') if 'Date' in df.columns else None
+    scoped = ex
+    for c, val in _scope_filters(store).items():
+        if c not in ex.columns:
+            return pd.Series(dtype=float)
+        scoped = scoped[scoped[c] == str(val)]
+    if months is not None and not months.empty:
+        scoped = scoped[(scoped['Month'] >= months.min()) & (scoped['Month'] <= months.max())]
+    movements = scoped.groupby(col, observed=True)['Movements'].sum()
+    counts = df[col].astype(str).value_counts()
+    result = (counts / movements.reindex(counts.index) * PER).dropna()
+    _RATES_BY.set(key, result)
+    return result
@@ -0,0 +1,191 @@
+# app/reports.py
+"""
+Server-side report generation for the "Export report" button and batch report jobs.
+
+build_report() renders a filtered frame into a self-contained, paginated HTML document:
+KPI summary, charts as inline SVG and the occurrence table. to_pdf() converts it with
+WeasyPrint when that package is installed; otherwise the HTML (print-ready via @page CSS)
+is what gets downloaded. Charts use kaleido for plotly SVG export when available and fall
+back to a small built-in SVG bar chart, so reports also work offline and without extras.
+
+report_batch() is a jobs task: one report per operator/airport, zipped.
+"""
+
+import html
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+
+from .atr import tracker
+from .utils import get_data, INCIDENT_AIRPORT_COL
+
+try:
+    import kaleido  # noqa: F401  (plotly static image export)
+    HAS_KALEIDO = True
+except ImportError:
+    HAS_KALEIDO = False
+
+try:
+    from weasyprint import HTML as _WeasyHTML
+except Exception:  # ImportError, or missing system libraries (pango/cairo)
+    _WeasyHTML = None
+
+TABLE_COLUMNS = ['S/N', 'Date', INCIDENT_AIRPORT_COL, 'Operator', 'Aircraft Type', 'Phase of flight', 'Status']
+MAX_TABLE_ROWS = 2000
+
+REPORT_CSS = """
+@page { size: A4; margin: 14mm; @bottom-right { content: counter(page) " / " counter(pages); font-size: 9px; } }
+body { font-family: Inter, Arial, sans-serif; color: #0f172a; font-size: 11px; }
+h1 { font-size: 18px; margin: 0 0 4px; } h2 { font-size: 14px; margin: 18px 0 6px; }
+.muted { color: #64748b; }
+.kpis { display: flex; gap: 10px; } .kpi { flex: 1; border: 1px solid #e2e8f0; border-radius: 6px; padding: 8px; }
+.kpi b { display: block; font-size: 18px; }
+table { width: 100%; border-collapse: collapse; } thead { display: table-header-group; }
+th, td { border-bottom: 1px solid #e2e8f0; padding: 3px 4px; text-align: left; }
+tr, .chart { page-break-inside: avoid; }
+.chart svg { width: 100%; height: auto; }
+"""
+
+
+def _svg_bars(labels, values, title, width=720, height=240):
+    """Minimal vector bar chart used when kaleido is not installed."""
+    n = max(len(values), 1)
+    top = max([v for v in values] + [1])
+    pad, bw = 30, (width - 40) / n
+    bars = []
+    for i, (lab, v) in enumerate(zip(labels, values)):
+        h = (height - 2 * pad) * (v / top)
+        x = 30 + i * bw
+        bars.append(f'<rect x="{x:.1f}" y="{height - pad - h:.1f}" width="{max(bw - 2, 1):.1f}" height="{h:.1f}" fill="#0ea5e9"><title>{html.escape(str(lab))}: {v}</title></rect>')
+        if n <= 24 or i % max(n // 12, 1) == 0:
+            bars.append(f'<text x="{x + bw / 2:.1f}" y="{height - 12}" font-size="8" text-anchor="middle">{html.escape(str(lab))}</text>')
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {width} {height}">'
+            f'<text x="30" y="16" font-size="12">{html.escape(title)}</text>'
+            f'<line x1="30" y1="{height - pad}" x2="{width - 10}" y2="{height - pad}" stroke="#94a3b8"/>'
+            + "".join(bars) + '</svg>')
+
+
+def _chart_svg(labels, values, title, kind='bar'):
+    if HAS_KALEIDO:
+        import plotly.express as px
+        fig = (px.line if kind == 'line' else px.bar)(x=list(labels), y=list(values), title=title)
+        fig.update_layout(width=720, height=260, margin={'l': 30, 'r': 10, 't': 30, 'b': 30})
+        return fig.to_image(format='svg').decode('utf-8')
+    return _svg_bars(labels, values, title)
+
+
+def _table(frame: pd.DataFrame) -> str:
+    head = "".join(f"<th>{html.escape(str(c))}</th>" for c in frame.columns)
+    body = []
+    for row in frame.itertuples(index=False):
+        body.append("<tr>" + "".join(f"<td>{'' if pd.isna(v) else html.escape(str(v))}</td>" for v in row) + "</tr>")
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(body)}</tbody></table>"
+
+
+def _describe_filters(store) -> str:
+    s = store or {}
+    parts = [f"{k}: {v}" for k, v in s.items() if v and v != 'All']
+    return ", ".join(parts) or "none"
+
+
+def build_report(df: pd.DataFrame, title: str = "Occurrence report", store: dict = None) -> str:
+    """Render the filtered frame into a standalone HTML report."""
+    df = df if df is not None else pd.DataFrame()
+    total = len(df)
+    open_count = int((df['Status'].astype(str).str.lower() == 'open').sum()) if 'Status' in df.columns else 0
+    # ATR figures from the tracker (register plus uploaded ATRs), as on the dashboard
+    atr_stats = tracker().summarize_rows(df)
+    pending = atr_stats['pending']
+    avg_close = f"{atr_stats['avg_days']:.0f} days" if atr_stats['avg_days'] is not None else '—'
+
+    charts = []
+    if total and 'Date' in df.columns:
+        dates = pd.to_datetime(df['Date'], errors='coerce').dropna()
+        if not dates.empty:
+            monthly = dates.dt.to_period('M').value_counts().sort_index()
+            charts.append(_chart_svg([str(p) for p in monthly.index], monthly.tolist(), 'Occurrences per month'))
+    for col, label in (('Operator', 'Top operators'), (INCIDENT_AIRPORT_COL, 'Top airports')):
+        if total and col in df.columns:
+            top = df[col].value_counts().head(10)
+            top = top[top > 0]
+            charts.append(_chart_svg(top.index.astype(str).tolist(), top.tolist(), label))
+
+    cols = [c for c in TABLE_COLUMNS if c in df.columns]
+    shown = df[cols].head(MAX_TABLE_ROWS)
+    note = f'<p class="muted">Showing first {MAX_TABLE_ROWS} of {total} rows.</p>' if total > MAX_TABLE_ROWS else ''
+
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title><style>{REPORT_CSS}</style></head>
+<body>
+<h1>{html.escape(title)}</h1>
+<div class="muted">Generated {datetime.now().strftime('%d-%m-%Y %H:%M')} · Filters: {html.escape(_describe_filters(store))}</div>
+<h2>Summary</h2>
+<div class="kpis">
+  <div class="kpi">Total occurrences<b>{total}</b></div>
+  <div class="kpi">Open investigations<b>{open_count}</b></div>
+  <div class="kpi">Recommendations outstanding<b>{pending}</b></div>
+  <div class="kpi">Avg days to close<b>{avg_close}</b></div>
+</div>
+<h2>Charts</h2>
+{''.join(f'<div class="chart">{c}</div>' for c in charts) or '<p class="muted">No dated occurrences.</p>'}
+<h2>Occurrences</h2>
+{note}{_table(shown)}
+</body></html>"""
+
+
+def to_pdf(report_html: str):
+    """PDF bytes, or None when WeasyPrint is unavailable."""
+    if _WeasyHTML is None:
+        return None
+    return _WeasyHTML(string=report_html).write_pdf()
+
+
+def render_file(df, title, store=None):
+    """(filename extension, bytes) - PDF when possible, HTML otherwise."""
+    report_html = build_report(df, title, store)
+    pdf = to_pdf(report_html)
+    if pdf is not None:
+        return "pdf", pdf
+    return "html", report_html.encode("utf-8")
+
+
+def _safe_name(value) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in str(value))[:60] or "blank"
+
+
+def report_batch(ctx, data_path, store, by, values):
+    """Jobs task: one report per value of column `by`, written into a zip."""
+    from .datasets import use_dataset
+
+    # the store's dataset, so the ATR tracker is the one of the frame's rows
+    with use_dataset((store or {}).get('dataset')):
+        return _report_batch(ctx, data_path, store, by, values)
+
+
+def _report_batch(ctx, data_path, store, by, values):
+    from .callbacks import apply_filters
+
+    df = get_data(data_path)
+    df = apply_filters(df.copy(), store) if df is not None else df
+    if df is None or by not in df.columns:
+        raise ValueError(f"column {by!r} unavailable")
+
+    out = ctx.output_path(f"reports-{_safe_name(by)}.zip")
+    groups = dict(tuple(df.groupby(by, observed=True, sort=False)))
+    used = set()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i, value in enumerate(values, 1):
+            sub = groups.get(value, df.iloc[0:0])
+            ext, payload = render_file(sub, f"{by}: {value}", {**(store or {}), by: value})
+            # distinct values can share a safe name ('Air India' / 'Air_India'); compared
+            # case-insensitively so the archive also extracts on case-insensitive filesystems
+            base, n = _safe_name(value), 0
+            name = f"{base}.{ext}"
+            while name.lower() in used:
+                n += 1
+                name = f"{base}-{i}.{ext}" if n == 1 else f"{base}-{i}-{n}.{ext}"
+            used.add(name.lower())
+            zf.writestr(name, payload)
+            ctx.progress(i, len(values), f"{by}: {value}")
+    return out
@@ -0,0 +1,261 @@
+# app/spatial.py
+"""
+Spatial layer: state assignment, state aggregates and nearest-aerodrome lookup.
+
+- StateIndex loads the India states GeoJSON (utils.INDIA_GEOJSON) once per file version
+  and buckets polygon bounding boxes into a uniform lat/lon grid. A point is only tested
+  (vectorized even-odd ray casting) against the polygons registered in its grid cell.
+- Aerodromes: a KD-tree over the airport master (scipy's cKDTree when installed, a
+  vectorized brute-force search otherwise - the master has a few hundred rows) answers
+  nearest-aerodrome queries for occurrences that carry coordinates but no airport code.
+- airport_states() / occurrence_states() are computed once per data version and
+  GeoJSON version through utils.derived(); renders only reindex the cached per-row
+  state column.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .utils import (derived, load_airport_master, normalize_airport_master, INDIA_GEOJSON,
+                    INCIDENT_AIRPORT_COL, MASTER_CODE_COL, MASTER_LAT_COL, MASTER_LON_COL,
+                    OCC_LAT_COL, OCC_LON_COL)
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+GRID_DEG = 1.0
+EARTH_RADIUS_KM = 6371.0
+MAX_AERODROME_KM = 50.0
+STATE_NAME_KEYS = ('st_nm', 'ST_NM', 'NAME_1', 'state', 'State', 'STATE', 'name', 'NAME')
+
+
+# -----------------------------------------
+# States: grid-indexed point-in-polygon
+# -----------------------------------------
+def _in_ring(x: np.ndarray, y: np.ndarray, ring: np.ndarray) -> np.ndarray:
+    """Even-odd rule for many points against one ring (lon/lat vertex array)."""
+    xs, ys = ring[:, 0], ring[:, 1]
+    xj, yj = np.roll(xs, 1), np.roll(ys, 1)
+    yy = y[:, None]
+    straddles = (ys > yy) != (yj > yy)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_cross = (xj - xs) * (yy - ys) / (yj - ys) + xs
+    return (straddles & (x[:, None] < x_cross)).sum(axis=1) % 2 == 1
+
+
+class StateIndex:
+
+    def __init__(self, geojson: dict):
+        self.name_key = None
+        self.names = []          # polygon id -> state name
+        self.polygons = []       # polygon id -> [exterior ring, *holes]
+        self.bboxes = []         # polygon id -> (minx, miny, maxx, maxy)
+        self.grid = {}           # (ix, iy) -> [polygon ids]
+        self.geojson = geojson
+        self.version = None      # file version set by state_index()
+        for feature in geojson.get('features', []):
+            props = feature.get('properties') or {}
+            if self.name_key is None:
+                self.name_key = next((k for k in STATE_NAME_KEYS if k in props), None)
+            name = props.get(self.name_key) if self.name_key else None
+            geom = feature.get('geometry') or {}
+            parts = [geom.get('coordinates', [])] if geom.get('type') == 'Polygon' else geom.get('coordinates', []) if geom.get('type') == 'MultiPolygon' else []
+            for part in parts:
+                rings = [np.asarray(r, dtype=np.float64)[:, :2] for r in part if len(r) >= 3]
+                if not rings:
+                    continue
+                pid = len(self.polygons)
+                self.names.append(name)
+                self.polygons.append(rings)
+                minx, miny = rings[0].min(axis=0)
+                maxx, maxy = rings[0].max(axis=0)
+                self.bboxes.append((minx, miny, maxx, maxy))
+                for ix in range(int(np.floor(minx / GRID_DEG)), int(np.floor(maxx / GRID_DEG)) + 1):
+                    for iy in range(int(np.floor(miny / GRID_DEG)), int(np.floor(maxy / GRID_DEG)) + 1):
+                        self.grid.setdefault((ix, iy), []).append(pid)
+
+    def assign(self, lat, lon) -> np.ndarray:
+        """State name per point (None outside every polygon)."""
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        out = np.full(len(lat), None, dtype=object)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        if not valid.any():
+            return out
+        cells = pd.DataFrame({
+            'ix': np.floor(lon[valid] / GRID_DEG).astype(np.int64),
+            'iy': np.floor(lat[valid] / GRID_DEG).astype(np.int64),
+            'pos': np.nonzero(valid)[0],
+        })
+        for (ix, iy), group in cells.groupby(['ix', 'iy']):
+            pos = group['pos'].to_numpy()
+            for pid in self.grid.get((ix, iy), []):
+                todo = pos[out[pos] == None]  # noqa: E711 (object array)
+                if len(todo) == 0:
+                    break
+                minx, miny, maxx, maxy = self.bboxes[pid]
+                x, y = lon[todo], lat[todo]
+                inside_box = (x >= minx) & (x <= maxx) & (y >= miny) & (y <= maxy)
+                if not inside_box.any():
+                    continue
+                cand = todo[inside_box]
+                rings = self.polygons[pid]
+                inside = _in_ring(lon[cand], lat[cand], rings[0])
+                for hole in rings[1:]:
+                    inside &= ~_in_ring(lon[cand], lat[cand], hole)
+                out[cand[inside]] = self.names[pid]
+        return out
+
+
+_STATE_INDEX = {}
+_STATE_LOCK = threading.Lock()
+
+
+def state_index():
+    """StateIndex for INDIA_GEOJSON, rebuilt only when the file changes; None if unavailable."""
+    try:
+        st = os.stat(INDIA_GEOJSON)
+        version = (INDIA_GEOJSON, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+    with _STATE_LOCK:
+        cached = _STATE_INDEX.get('index')
+        if cached is None or cached[0] != version:
+            try:
+                with open(INDIA_GEOJSON) as fh:
+                    index = StateIndex(json.load(fh))
+                index.version = version
+                cached = (version, index)
+            except Exception as e:
+                print(f"[spatial.state_index] failed to read {INDIA_GEOJSON}: {e}")
+                cached = (version, None)
+            _STATE_INDEX['index'] = cached
+        return cached[1]
+
+
+# -----------------------------------------
+# Aerodromes: KD-tree nearest neighbour
+# -----------------------------------------
+def _unit_vectors(lat, lon) -> np.ndarray:
+    la, lo = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    return np.column_stack([np.cos(la) * np.cos(lo), np.cos(la) * np.sin(lo), np.sin(la)])
+
+
+class AerodromeIndex:
+
+    def __init__(self, master: pd.DataFrame):
+        master = master if master is not None else pd.DataFrame()
+        cols = {MASTER_CODE_COL, MASTER_LAT_COL, MASTER_LON_COL}
+        if master.empty or not cols.issubset(master.columns):
+            master = pd.DataFrame(columns=sorted(cols))
+        lat = pd.to_numeric(master[MASTER_LAT_COL], errors='coerce')
+        lon = pd.to_numeric(master[MASTER_LON_COL], errors='coerce')
+        ok = (lat.notna() & lon.notna()).to_numpy()
+        self.codes = master.loc[ok, MASTER_CODE_COL].astype(str).str.strip().to_numpy()
+        self.lat, self.lon = lat[ok].to_numpy(), lon[ok].to_numpy()
+        self.xyz = _unit_vectors(self.lat, self.lon)
+        self.tree = cKDTree(self.xyz) if cKDTree is not None and len(self.xyz) else None
+
+    def nearest(self, lat, lon, max_km: float = MAX_AERODROME_KM):
+        """(codes, distances_km) of the nearest aerodrome per point; None beyond max_km."""
+        q = _unit_vectors(lat, lon)
+        codes = np.full(len(q), None, dtype=object)
+        dist = np.full(len(q), np.nan)
+        valid = ~np.isnan(q).any(axis=1)
+        if not valid.any() or len(self.xyz) == 0:
+            return codes, dist
+        if self.tree is not None:
+            chord, idx = self.tree.query(q[valid])
+        else:
+            # brute force in chunks: |a-b|^2 = 2 - 2 a.b for unit vectors
+            idx = np.empty(valid.sum(), dtype=np.int64)
+            chord = np.empty(valid.sum())
+            qv = q[valid]
+            for start in range(0, len(qv), 4096):
+                dots = qv[start:start + 4096] @ self.xyz.T
+                best = dots.argmax(axis=1)
+                idx[start:start + 4096] = best
+                chord[start:start + 4096] = np.sqrt(np.maximum(2.0 - 2.0 * dots[np.arange(len(best)), best], 0.0))
+        km = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chord / 2.0, 1.0))
+        near = km <= max_km
+        pos = np.nonzero(valid)[0]
+        codes[pos[near]] = self.codes[idx[near]]
+        dist[pos] = km
+        return codes, dist
+
+
+def _master(_df=None) -> pd.DataFrame:
+    return normalize_airport_master(load_airport_master())
+
+
+def aerodrome_index() -> AerodromeIndex:
+    return derived('aerodrome_index', lambda df: AerodromeIndex(_master()))
+
+
+# -----------------------------------------
+# Per data version assignments
+# -----------------------------------------
+def _build_airport_states(_df) -> dict:
+    idx, master = state_index(), _master()
+    if idx is None or master is None or master.empty or MASTER_CODE_COL not in master.columns:
+        return {}
+    states = idx.assign(pd.to_numeric(master.get(MASTER_LAT_COL), errors='coerce'),
+                        pd.to_numeric(master.get(MASTER_LON_COL), errors='coerce'))
+    codes = master[MASTER_CODE_COL].astype(str).str.strip()
+    return {c: s for c, s in zip(codes, states) if s is not None}
+
+
+def _state_key(name: str) -> str:
+    # the assignments depend on the GeoJSON too: a new state_index() version gets new entries
+    return f"{name}@{getattr(state_index(), 'version', None)}"
+
+
+def airport_states() -> dict:
+    """Airport code -> state, assigned once per data version and GeoJSON version."""
+    return derived(_state_key('airport_states'), _build_airport_states)
+
+
+def _build_occurrence_aerodromes(df) -> pd.Series:
+    """Airport code per occurrence; nearest aerodrome for rows with coordinates only."""
+    if df is None or df.empty:
+        return pd.Series(dtype=object)
+    codes = df[INCIDENT_AIRPORT_COL].astype(object) if INCIDENT_AIRPORT_COL in df.columns else pd.Series(None, index=df.index, dtype=object)
+    known = set(aerodrome_index().codes)
+    missing = ~codes.astype(str).str.strip().isin(known).to_numpy()
+    if OCC_LAT_COL in df.columns and missing.any():
+        lat = pd.to_numeric(df[OCC_LAT_COL], errors='coerce').to_numpy()[missing]
+        lon = pd.to_numeric(df[OCC_LON_COL], errors='coerce').to_numpy()[missing]
+        nearest, _ = aerodrome_index().nearest(lat, lon)
+        filled = codes.to_numpy().copy()
+        filled[np.nonzero(missing)[0][nearest != None]] = nearest[nearest != None]  # noqa: E711
+        codes = pd.Series(filled, index=df.index, dtype=object)
+    return codes
+
+
+def occurrence_aerodromes() -> pd.Series:
+    return derived('occurrence_aerodromes', _build_occurrence_aerodromes)
+
+
+def _build_occurrence_states(df) -> pd.Series:
+    if df is None or df.empty:
+        return pd.Series(dtype=object)
+    return occurrence_aerodromes().astype(str).str.strip().map(airport_states())
+
+
+def occurrence_states() -> pd.Series:
+    """State per occurrence (row label of utils.get_data()), computed once per data and GeoJSON version."""
+    return derived(_state_key('occurrence_states'), _build_occurrence_states)
+
+
+def state_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Occurrences per state for a filtered frame (rows keep their labels from get_data())."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=['State', 'count'])
+    states = occurrence_states().reindex(df.index).dropna()
+    return states.value_counts().rename_axis('State').reset_index(name='count')
@@ -0,0 +1,81 @@
+# app/tasks.py
+"""
+Long-running analytics executed through app.jobs (never inside a callback).
+Each task takes a JobContext first and explicit file paths, because pool processes
+start fresh and do not see paths patched into app.utils at runtime.
+File results are returned as paths and served from /jobs/<id>/result.
+"""
+
+import pandas as pd
+
+from .utils import get_data, load_airport_master, normalize_airport_master, INCIDENT_AIRPORT_COL
+
+CHUNK_ROWS = 50000
+
+
+def geocode_register(ctx, data_path, master_path, chunk=200):
+    """Fuzzy-geocode every distinct airport/place string in the register."""
+    from .components.map import _fuzzy_map
+
+    df = get_data(data_path)
+    master = normalize_airport_master(load_airport_master(master_path))
+    if df is None or df.empty or INCIDENT_AIRPORT_COL not in df.columns or master is None or master.empty:
+        raise ValueError("incidents or airport master unavailable")
+
+    # match each distinct place once instead of once per occurrence
+    places = pd.Series(df[INCIDENT_AIRPORT_COL].dropna().astype(str).unique())  # stripped at ingest
+    total = len(places)
+    parts = []
+    for start in range(0, total, chunk):
+        block = pd.DataFrame({INCIDENT_AIRPORT_COL: places.iloc[start:start + chunk].values})
+        parts.append(_fuzzy_map(block, master))
+        ctx.progress(min(start + chunk, total), total, "matching airport names")
+
+    mapped = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    mapped = mapped.rename(columns={'_mapped_code': 'Code', '_mapped_lat': 'Latitude', '_mapped_lon': 'Longitude'})
+    out = ctx.output_path("geocoded_airports.csv")
+    mapped.to_csv(out, index=False)
+    return out
+
+
+def trend_recompute(ctx, data_path, years=5):
+    """Monthly occurrence counts per operator over the last `years` years."""
+    df = get_data(data_path)
+    if df is None or df.empty or 'Date' not in df.columns:
+        raise ValueError("incidents unavailable or without dates")
+
+    dates = pd.to_datetime(df['Date'], errors='coerce')
+    since = pd.Timestamp.now().normalize() - pd.DateOffset(years=years)
+    window = df.loc[dates >= since].assign(Month=dates[dates >= since].dt.to_period('M'))
+    ctx.progress(1, 3, "grouping")
+
+    by = ['Month', 'Operator'] if 'Operator' in window.columns else ['Month']
+    counts = window.groupby(by, observed=True).size()
+    ctx.progress(2, 3, "pivoting")
+
+    table = counts.unstack(fill_value=0) if len(by) > 1 else counts.to_frame('count')
+    table.index = table.index.astype(str)
+    out = ctx.output_path("trends.csv")
+    table.to_csv(out)
+    ctx.progress(3, 3, "written")
+    return out
+
+
+def bulk_export(ctx, data_path, store):
+    """Write the rows matching the filter store to CSV in chunks."""
+    from .callbacks import apply_filters
+
+    df = get_data(data_path)
+    df = apply_filters(df.copy(), store) if df is not None else df
+    if df is None:
+        raise ValueError("incidents unavailable")
+
+    out = ctx.output_path("export.csv")
+    total = len(df)
+    with open(out, "w", newline="") as fh:
+        if total == 0:
+            df.to_csv(fh, index=False)
+        for start in range(0, total, CHUNK_ROWS):
+            df.iloc[start:start + CHUNK_ROWS].to_csv(fh, index=False, header=(start == 0))
+            ctx.progress(min(start + CHUNK_ROWS, total), total, "writing rows")
+    return out
@@ -1,23 +1,56 @@
 
 # app/utils.py
 import os
+import threading
+import numpy as np
 import pandas as pd
 
+try:
+    import pyarrow  # noqa: F401  (optional; Arrow-backed string columns)
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = None
+
 # >>> EDIT THESE PATHS if you store your CSVs elsewhere <<<
+# (or set DGCA_DATA_CSV / DGCA_AIRPORT_MASTER_CSV / DGCA_EXPOSURE_PATH / DGCA_INDIA_GEOJSON,
+#  e.g. to run against the synthetic data from scripts/loadtest.py)
 # Path to incidents CSV (change to your actual file if needed)
-DATA_CSV = "/Users/karunatirkey/Downloads/sample_data.csv"
+DATA_CSV = os.environ.get("DGCA_DATA_CSV", "/Users/karunatirkey/Downloads/sample_data.csv")
 UPLOADED_IMAGE = "/mnt/data/87226007-e0d9-4f49-833d-9d563f059920.png"
 # Airport master path (uploaded file in workspace)
-AIRPORT_MASTER_CSV = "/Users/karunatirkey/Library/CloudStorage/OneDrive-Personal/DGCA/airports_india.csv"
+AIRPORT_MASTER_CSV = os.environ.get("DGCA_AIRPORT_MASTER_CSV", "/Users/karunatirkey/Library/CloudStorage/OneDrive-Personal/DGCA/airports_india.csv")
+
+# Optional exposure table: movements per airport (and optionally operator) per month.
+# CSV, Parquet or Feather; columns like Month, Code/Airport, [Operator], Movements/Departures
+EXPOSURE_PATH = os.environ.get("DGCA_EXPOSURE_PATH", "/Users/karunatirkey/Library/CloudStorage/OneDrive-Personal/DGCA/movements.csv")
+
+# Optional India states GeoJSON (state boundaries for state-level aggregation)
+INDIA_GEOJSON = os.environ.get("DGCA_INDIA_GEOJSON", "/Users/karunatirkey/Library/CloudStorage/OneDrive-Personal/DGCA/india_states.geojson")
+
+# Append-only log of ATRs recorded from the detail page (see app/atr.py)
+ATR_LOG_CSV = "atr_updates.csv"
 
 # Column mapping
 INCIDENT_AIRPORT_COL = "Airport / Place of occurrence"
 MASTER_CODE_COL = "Code"
 MASTER_LAT_COL = "Latitude"
 MASTER_LON_COL = "Longitude"
+MASTER_NAME_COL = "Airport Name"
+# coordinates reported with an occurrence (kept apart from the airport master's)
+OCC_LAT_COL = "Occurrence Latitude"
+OCC_LON_COL = "Occurrence Longitude"
+
+# Column schema for optimize_dtypes(): the incidents register after the airport join
+CATEGORY_COLS = [INCIDENT_AIRPORT_COL, "Operator", "Aircraft Type", "Phase of flight", "Status",
+                 "ATR of Recommendations", MASTER_CODE_COL]
+TEXT_COLS = ["Brief Description", "Findings", "Probable Cause", "Recommendations", "Flight No"]
+INT_COLS = ["S/N"]
+FLOAT32_COLS = ["Latitude", "Longitude", OCC_LAT_COL, OCC_LON_COL]
+# a schema category column with more distinct values than this share of rows stays text
+CATEGORY_MAX_RATIO = 0.5
 
 def load_airport_master(path: str = None) -> pd.DataFrame:
-    p = path or AIRPORT_MASTER_CSV
+    p = path or dataset_paths()["master"]
     if not os.path.exists(p):
         # try relative
         rel = os.path.join(os.getcwd(), p)
@@ -30,61 +63,382 @@ def load_airport_master(path: str = None) -> pd.DataFrame:
         print(f"[load_airport_master] failed to read {p}: {e}")
         return pd.DataFrame()
 
-def load_data(path: str = None, parse_dates: list = None) -> pd.DataFrame:
+def normalize_airport_master(am: pd.DataFrame) -> pd.DataFrame:
+    """Airport master with the MASTER_* columns, upper-case codes and numeric coordinates (ingest.clean_master)."""
+    from .ingest import clean_master
+
+    return clean_master(am)[0]
+
+
+def load_exposure(path: str = None) -> pd.DataFrame:
+    """
+    Exposure table normalized to columns: Month (Period[M]), INCIDENT_AIRPORT_COL,
+    optional Operator, Movements. Returns an empty frame if missing or unusable.
+    """
+    from .ingest import airport_key
+
+    p = path or EXPOSURE_PATH
+    if not p or not os.path.exists(p):
+        return pd.DataFrame()
+    try:
+        ext = os.path.splitext(p)[1].lower()
+        if ext in (".parquet", ".pq"):
+            ex = pd.read_parquet(p)
+        elif ext in (".feather", ".arrow"):
+            ex = pd.read_feather(p)
+        else:
+            ex = pd.read_csv(p)
+    except Exception as e:
+        print(f"[load_exposure] failed to read {p}: {e}")
+        return pd.DataFrame()
+
+    lower = {c.lower().strip(): c for c in ex.columns}
+    month_col = next((lower[c] for c in ("month", "period", "date", "year_month") if c in lower), None)
+    value_col = next((lower[c] for c in ("movements", "departures", "flights", "cycles") if c in lower), None)
+    airport_col = next((lower[c] for c in ("code", "airport", "airport code", "iata", "icao", INCIDENT_AIRPORT_COL.lower()) if c in lower), None)
+    operator_col = lower.get("operator")
+    if not month_col or not value_col or not (airport_col or operator_col):
+        print(f"[load_exposure] {p}: need month, movements and airport/operator columns; got {list(ex.columns)}")
+        return pd.DataFrame()
+
+    out = pd.DataFrame({
+        "Month": pd.to_datetime(ex[month_col], errors="coerce").dt.to_period("M"),
+        "Movements": pd.to_numeric(ex[value_col], errors="coerce"),
+    })
+    if airport_col:
+        # same canonical codes as the master and the matched incident airports (app/ingest.py)
+        out[INCIDENT_AIRPORT_COL] = airport_key(ex[airport_col])
+    if operator_col:
+        out["Operator"] = ex[operator_col].astype(str).str.strip()
+    return out.dropna(subset=["Month", "Movements"])
+
+
+def load_data(path: str = None, parse_dates: list = None, master_path: str = None) -> pd.DataFrame:
     """
     Load incidents and merge airport master coordinates.
-    Returns incidents DataFrame augmented with Latitude and Longitude columns (if available).
+    Returns incidents DataFrame augmented with Latitude and Longitude columns (if available),
+    sorted by Date (see sort_by_date()).
     """
-    p = path or DATA_CSV
+    from .ingest import clean_incidents, clean_master, record_report, unmatched_airports
+
+    p = path or dataset_paths()["data"]
     parse_dates = parse_dates or ["Date"]
     try:
-        df = pd.read_csv(p, parse_dates=parse_dates, low_memory=False)
+        # dates are parsed by the ingest stage, which also counts the unparseable ones
+        df = pd.read_csv(p, low_memory=False)
     except Exception as e:
         print(f"[load_data] failed to read {p}: {e}")
         return pd.DataFrame()
 
-    # ensure column names are present (rename common alternates)
-    if INCIDENT_AIRPORT_COL not in df.columns:
-        for alt in ["Airport", "Airport Name", "Airport/Place of occurrence", "Airport / Place of occurrence"]:
-            if alt in df.columns:
-                df.rename(columns={alt: INCIDENT_AIRPORT_COL}, inplace=True)
-                break
+    am, master_report = clean_master(load_airport_master(master_path or dataset_paths(p)["master"]))
+    codes = am[MASTER_CODE_COL].dropna() if am is not None and MASTER_CODE_COL in am.columns else None
 
-    am = load_airport_master()
-    if am is None or am.empty:
-        print("[load_data] airport master missing or empty; returning incidents without coords")
-        return df
+    # column names, whitespace, casing, airport codes and dates (app/ingest.py)
+    df, report = clean_incidents(df, parse_dates, master_codes=codes)
+    report["master"] = master_report
 
-    # normalize master column names if needed
-    if MASTER_CODE_COL not in am.columns:
-        alt_code = next((c for c in am.columns if c.lower() in ("code", "iata", "icao")), None)
-        if alt_code:
-            am.rename(columns={alt_code: MASTER_CODE_COL}, inplace=True)
+    # keep coordinates reported with the occurrence itself (the master join below
+    # would otherwise collide with them); spatial.py uses them for nearest-aerodrome lookup
+    if "Latitude" in df.columns and "Longitude" in df.columns:
+        df.rename(columns={"Latitude": OCC_LAT_COL, "Longitude": OCC_LON_COL}, inplace=True)
 
-    if MASTER_LAT_COL not in am.columns or MASTER_LON_COL not in am.columns:
-        lat_candidate = next((c for c in am.columns if "lat" in c.lower()), None)
-        lon_candidate = next((c for c in am.columns if any(x in c.lower() for x in ("lon","lng","long"))), None)
-        if lat_candidate:
-            am.rename(columns={lat_candidate: MASTER_LAT_COL}, inplace=True)
-        if lon_candidate:
-            am.rename(columns={lon_candidate: MASTER_LON_COL}, inplace=True)
+    if am is None or am.empty:
+        print("[load_data] airport master missing or empty; returning incidents without coords")
+        record_report(p, report)
+        return sort_by_date(optimize_dtypes(df))
 
     # left join incidents -> airport master using INCIDENT_AIRPORT_COL -> MASTER_CODE_COL
+    # (matching airport values are the canonical master codes; the master has one row per code)
     if INCIDENT_AIRPORT_COL in df.columns and MASTER_CODE_COL in am.columns:
         merged = df.merge(
-            am[[MASTER_CODE_COL, MASTER_LAT_COL, MASTER_LON_COL]].drop_duplicates(),
+            am[[MASTER_CODE_COL, MASTER_LAT_COL, MASTER_LON_COL]],
             left_on=INCIDENT_AIRPORT_COL,
             right_on=MASTER_CODE_COL,
             how="left",
             validate="m:1"
         )
-        # coerce to numeric
-        merged[MASTER_LAT_COL] = pd.to_numeric(merged[MASTER_LAT_COL], errors="coerce")
-        merged[MASTER_LON_COL] = pd.to_numeric(merged[MASTER_LON_COL], errors="coerce")
+        report["unmatched_airports"] = unmatched_airports(merged, merged[MASTER_CODE_COL].notna())
         # expose as Latitude/Longitude in incidents
         merged["Latitude"] = merged.get(MASTER_LAT_COL)
         merged["Longitude"] = merged.get(MASTER_LON_COL)
-        return merged
+        if OCC_LAT_COL in merged.columns:
+            merged["Latitude"] = merged["Latitude"].combine_first(pd.to_numeric(merged[OCC_LAT_COL], errors="coerce"))
+            merged["Longitude"] = merged["Longitude"].combine_first(pd.to_numeric(merged[OCC_LON_COL], errors="coerce"))
+        record_report(p, report)
+        return sort_by_date(optimize_dtypes(merged))
     else:
         print("[load_data] could not find join columns; returning raw incidents")
+        record_report(p, report)
+        return sort_by_date(optimize_dtypes(df))
+
+
+# -----------------------------------------
+# Compact dtypes
+# -----------------------------------------
+def _intern(s: pd.Series) -> pd.Series:
+    """Object column whose equal strings share one object (fallback without pyarrow)."""
+    uniques = s.dropna().unique()
+    return s.map(dict(zip(uniques, uniques)))
+
+
+def optimize_dtypes(df: pd.DataFrame, report: bool = True) -> pd.DataFrame:
+    """
+    Compact representation per the column schema above: categoricals for the low-cardinality
+    fields, Arrow-backed (or interned) strings for narrative fields, nullable Int64 S/N and
+    float32 coordinates. Columns that do not convert cleanly are left as they are.
+    """
+    if df is None or df.empty:
+        return df
+    before = df.memory_usage(deep=True).sum() if report else 0
+    df = df.copy()
+    n = len(df)
+    text_cols = list(TEXT_COLS)
+    for c in CATEGORY_COLS:
+        if c in df.columns and df[c].dtype == object:
+            if df[c].nunique(dropna=True) <= max(1, CATEGORY_MAX_RATIO * n):
+                df[c] = df[c].astype("category")
+            else:
+                text_cols.append(c)
+    for c in text_cols:
+        if c in df.columns and df[c].dtype == object:
+            df[c] = df[c].astype(TEXT_DTYPE) if TEXT_DTYPE else _intern(df[c])
+    for c in INT_COLS:
+        if c in df.columns and not pd.api.types.is_integer_dtype(df[c]):
+            num = pd.to_numeric(df[c], errors="coerce")
+            # only when every present value is a whole number (S/N like '12A' stays text)
+            if num.notna().sum() == df[c].notna().sum() and (num.dropna() % 1 == 0).all():
+                df[c] = num.astype("Int64")
+        elif c in df.columns:
+            df[c] = df[c].astype("Int64")
+    for c in FLOAT32_COLS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype(np.float32)
+    if report:
+        after = df.memory_usage(deep=True).sum()
+        print(f"[optimize_dtypes] {n} rows: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB")
+    return df
+
+
+def equals_ci(s: pd.Series, value) -> np.ndarray:
+    """Case-insensitive equality mask; categoricals compare their categories only."""
+    v = str(value).lower()
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        hit = np.asarray(s.cat.categories.astype(str).str.lower() == v)
+        codes = s.cat.codes.to_numpy()
+        return np.where(codes >= 0, hit[codes], False) if len(hit) else np.zeros(len(s), dtype=bool)
+    return (s.astype(str).str.lower() == v).to_numpy() & s.notna().to_numpy()
+
+
+def contains_ci(s: pd.Series, q: str) -> np.ndarray:
+    """Case-insensitive substring mask; categoricals search their categories only."""
+    q = q.lower()
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        hit = np.asarray(s.cat.categories.astype(str).str.lower().str.contains(q, regex=False))
+        codes = s.cat.codes.to_numpy()
+        return np.where(codes >= 0, hit[codes], False) if len(hit) else np.zeros(len(s), dtype=bool)
+    mask = s.astype(str).str.lower().str.contains(q, regex=False)
+    return mask.fillna(False).to_numpy(dtype=bool) & s.notna().to_numpy()
+
+
+# -----------------------------------------
+# Date range index
+# -----------------------------------------
+# load_data() parses Date once and keeps the register sorted by it (NaT last), so a time
+# window is a contiguous block of rows located by binary search: no date parsing and no
+# full scan per request. Row selections of a sorted frame (boolean masks, slices, copies)
+# stay sorted and keep the df.attrs flag; anything that reorders rows must not rely on it.
+DATE_COL = "Date"
+
+
+def sort_by_date(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame with a parsed Date column, sorted by it (stable, NaT last) and flagged as such."""
+    if df is None or df.empty or DATE_COL not in df.columns:
+        return df
+    if not pd.api.types.is_datetime64_any_dtype(df[DATE_COL]):
+        df = df.assign(**{DATE_COL: pd.to_datetime(df[DATE_COL], errors="coerce")})
+    df = df.sort_values(DATE_COL, kind="stable", na_position="last", ignore_index=True)
+    df.attrs["sorted_by"] = DATE_COL
+    return df
+
+
+def date_positions(dates: pd.Series, start=None, end=None) -> tuple:
+    """[i, j) row positions with start <= date < end in a sorted date column (binary search)."""
+    values = dates.to_numpy()
+    i = 0 if start is None else int(np.searchsorted(values, np.datetime64(pd.Timestamp(start)), "left"))
+    # NaT sorts last, so without an end bound the range stops at the first NaT
+    stop = np.datetime64("NaT") if end is None else np.datetime64(pd.Timestamp(end))
+    j = int(np.searchsorted(values, stop, "left"))
+    return i, max(i, j)
+
+
+def date_slice(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """Rows with start <= Date < end (either bound may be None)."""
+    if df is None or DATE_COL not in df.columns or (start is None and end is None):
         return df
+    if df.attrs.get("sorted_by") == DATE_COL:
+        i, j = date_positions(df[DATE_COL], start, end)
+        return df.iloc[i:j]
+    # unsorted frames (not from get_data()) fall back to a mask
+    dates = pd.to_datetime(df[DATE_COL], errors="coerce")
+    mask = dates.notna()
+    if start is not None:
+        mask &= dates >= pd.Timestamp(start)
+    if end is not None:
+        mask &= dates < pd.Timestamp(end)
+    return df[mask]
+
+
+# -----------------------------------------
+# Dataset cache (one read per file version, bounded by memory)
+# -----------------------------------------
+# Each loaded dataset is one entry {version, df, derived} keyed by its data path, so a
+# frame and the indexes/aggregates built from it are accounted and evicted together.
+# DGCA_DATASET_CACHE_ENTRIES / DGCA_DATASET_CACHE_MB bound the number of datasets held
+# and their total size; the least recently used dataset is dropped first.
+DATASET_CACHE_ENTRIES = int(os.environ.get("DGCA_DATASET_CACHE_ENTRIES", "8"))
+DATASET_CACHE_MB = float(os.environ.get("DGCA_DATASET_CACHE_MB", "2048"))
+
+
+def _dataset_evicted(path, entry):
+    from .datasets import notify_evicted
+
+    print(f"[utils.dataset_cache] evicted {path} ({entry.get('nbytes', 0) / 1e6:.1f} MB)")
+    notify_evicted(path)
+
+
+def _entry_size(entry) -> int:
+    return entry.get("nbytes") or 0
+
+
+_DATASETS = None
+_DATA_LOCK = threading.Lock()
+_LOAD_LOCKS = {}
+
+
+def dataset_cache():
+    """The LRUCache holding loaded datasets (created on first use)."""
+    global _DATASETS
+    from .cache import LRUCache
+
+    with _DATA_LOCK:
+        if _DATASETS is None:
+            _DATASETS = LRUCache(DATASET_CACHE_ENTRIES, max_bytes=int(DATASET_CACHE_MB * 1e6),
+                                 sizeof=_entry_size, on_evict=_dataset_evicted)
+        return _DATASETS
+
+
+def _load_lock(p):
+    with _DATA_LOCK:
+        return _LOAD_LOCKS.setdefault(p, threading.Lock())
+
+
+def dataset_paths(path: str = None) -> dict:
+    """data / master / atr_log paths of the current dataset (see datasets.py), or of `path`."""
+    from . import datasets
+
+    entry = datasets.for_data_path(path) if path else datasets.current()
+    return {"data": entry["data"], "master": entry["master"], "atr_log": entry["atr_log"]}
+
+
+def _file_stamp(p):
+    try:
+        st = os.stat(p)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def data_version(path: str = None) -> tuple:
+    """Identifies the current incidents + airport master files; changes when either is rewritten."""
+    paths = dataset_paths(path)
+    return (paths["data"], _file_stamp(paths["data"]), _file_stamp(paths["master"]))
+
+
+def _dataset_entry(path: str = None):
+    from .cache import sizeof
+
+    paths = dataset_paths(path)
+    p = paths["data"]
+    version = (p, _file_stamp(p), _file_stamp(paths["master"]))
+    cache = dataset_cache()
+    entry = cache.get(p)
+    if entry is not None and entry["version"] == version:
+        return p, entry
+    with _load_lock(p):
+        entry = cache.get(p)
+        if entry is not None and entry["version"] == version:
+            return p, entry
+        df = load_data(p, master_path=paths["master"])
+        entry = {"version": version, "df": df, "derived": {}, "nbytes": sizeof(df)}
+        cache.set(p, entry)
+        return p, entry
+
+
+def get_data(path: str = None) -> pd.DataFrame:
+    """
+    load_data() memoized per data_version(); without `path`, the dataset selected by
+    datasets.use_dataset(). The returned frame is shared between requests: treat it as
+    read-only and copy before mutating.
+    """
+    return _dataset_entry(path)[1]["df"]
+
+
+def derived(name: str, build, path: str = None):
+    """
+    build(df) over get_data(path), computed once per data_version() and shared by
+    all requests (indexes, aggregates). Treat the result as read-only. The result is
+    counted against the dataset's memory budget and evicted with it.
+    """
+    from .cache import sizeof
+
+    p, entry = _dataset_entry(path)
+    if name in entry["derived"]:
+        return entry["derived"][name]
+    value = build(entry["df"])
+    cache = dataset_cache()
+    with _DATA_LOCK:
+        entry["derived"][name] = value
+        entry["nbytes"] = entry.get("nbytes", 0) + sizeof(value)
+    # re-set only if the entry is still the cached one, so the cache re-accounts its size
+    if cache.get(p) is entry:
+        cache.set(p, entry)
+    return value
+
+
+def dataset_cache_stats() -> dict:
+    return dataset_cache().stats()
+
+
+# -----------------------------------------
+# S/N lookup
+# -----------------------------------------
+def sn_key(value) -> str:
+    """Canonical S/N text: 1254, 1254.0 and ' 1254' all map to '1254'."""
+    try:
+        f = float(value)
+        if f.is_integer():
+            return str(int(f))
+    except (TypeError, ValueError):
+        pass
+    return str(value).strip()
+
+
+def _build_sn_index(df: pd.DataFrame) -> dict:
+    if df is None or df.empty or 'S/N' not in df.columns:
+        return {}
+    keys = [sn_key(v) for v in df['S/N'].tolist()]
+    # iterate backwards so the first occurrence of a duplicated S/N wins
+    return dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+
+
+def sn_index(path: str = None) -> dict:
+    """S/N -> row position in get_data(path)."""
+    return derived('sn_index', _build_sn_index, path)
+
+
+def get_record(sn, path: str = None):
+    """The row for one S/N as a dict (only that row is materialized), or None."""
+    pos = sn_index(path).get(sn_key(sn))
+    if pos is None:
+        return None
+    return get_data(path).iloc[pos].to_dict()
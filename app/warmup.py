@@ -0,0 +1,215 @@
+# app/warmup.py
+"""
+Cache warm-up after a worker has started, and before a deployment takes traffic.
+
+run.py only builds the layout and registers callbacks; pandas, plotly.express, the
+dataset and its derived indexes are loaded here instead. warm_up() then renders the
+most requested filter states through the same code path as display_page()
+(callbacks.render_page) plus the lazily loaded map and chart columns, which fills the
+filtered-frame, figure and aggregate caches of the worker.
+
+Filter states, most frequent first:
+    1. states recorded in the filter usage log (callbacks.FILTER_LOG); the gunicorn
+       access log only shows POST /_dash-update-component without bodies. These carry
+       their dataset (datasets.py), so frequently used datasets are loaded as well.
+       Only the most recent WARMUP_LOG_BYTES of the log (and its rotated '.1' file)
+       are read, so the start-up cost does not grow with the log
+    2. no filter, each of the top operators, each of the top airports, each of the
+       last N months of the default register
+Requests that arrive before the warm-up finishes simply do the same work themselves.
+Rendering stops once WARMUP_BUDGET seconds have passed since the warm-up started, so a
+sync warm-up stays well inside gunicorn's worker timeout (120s in gunicorn.conf.py).
+
+Tunables (environment):
+    DGCA_WARMUP         'background' (default): daemon thread after the worker starts
+                        'sync': finish before the worker accepts requests (deploys)
+                        '0': disabled
+    DGCA_WARMUP_STATES  max filter states rendered (default 30)
+    DGCA_WARMUP_TOP     top operators / airports included (default 5)
+    DGCA_WARMUP_MONTHS  most recent months included (default 3)
+    DGCA_WARMUP_LOG_KB  tail of the filter usage log read for states (default 1024)
+    DGCA_WARMUP_BUDGET  seconds after which no further states are rendered (default 60)
+
+`python -m app.warmup` prints the chosen states and their render times.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+WARMUP_MODE = os.environ.get("DGCA_WARMUP", "background").lower()
+WARMUP_ENABLED = WARMUP_MODE not in ("0", "off", "false")
+WARMUP_STATES = int(os.environ.get("DGCA_WARMUP_STATES", "30"))
+WARMUP_TOP = int(os.environ.get("DGCA_WARMUP_TOP", "5"))
+WARMUP_MONTHS = int(os.environ.get("DGCA_WARMUP_MONTHS", "3"))
+WARMUP_LOG_BYTES = int(os.environ.get("DGCA_WARMUP_LOG_KB", "1024")) * 1024
+WARMUP_BUDGET = float(os.environ.get("DGCA_WARMUP_BUDGET", "60"))
+
+_started = False
+_lock = threading.Lock()
+
+
+# -----------------------------------------
+# Filter states
+# -----------------------------------------
+def _state_key(store: dict) -> str:
+    return json.dumps(store, sort_keys=True, default=str)
+
+
+def _tail_lines(paths, max_bytes: int) -> list:
+    """Complete lines from the last `max_bytes` of `paths` (newest file first)."""
+    lines = []
+    for p in paths:
+        if max_bytes <= 0:
+            break
+        try:
+            with open(p, 'rb') as fh:
+                size = fh.seek(0, os.SEEK_END)
+                start = max(0, size - max_bytes)
+                fh.seek(start)
+                chunk = fh.read()
+        except OSError:
+            continue
+        max_bytes -= len(chunk)
+        part = chunk.split(b'\n')
+        # a line cut by the window start is incomplete
+        lines = (part[1:] if start > 0 else part) + lines
+    return lines
+
+
+def logged_states(path: str = None, limit: int = None, max_bytes: int = WARMUP_LOG_BYTES) -> list:
+    """Filter states from the most recent `max_bytes` of the filter usage log, most frequent first."""
+    from .callbacks import FILTER_LOG, DEFAULT_FILTERS
+
+    p = path or FILTER_LOG
+    counts = Counter()
+    for line in _tail_lines([p, p + '.1'], max_bytes):
+        try:
+            store = json.loads(line).get('store')
+        except (ValueError, AttributeError):
+            continue
+        if isinstance(store, dict):
+            counts[_state_key(dict(DEFAULT_FILTERS, **store))] += 1
+    return [json.loads(k) for k, _ in counts.most_common(limit)]
+
+
+def candidate_states(top: int = WARMUP_TOP, months: int = WARMUP_MONTHS) -> list:
+    """No filter, top operators, top airports and the last `months` months of the register."""
+    import pandas as pd
+    from .callbacks import DEFAULT_FILTERS
+    from .utils import get_data, INCIDENT_AIRPORT_COL
+
+    df = get_data()
+    states = [dict(DEFAULT_FILTERS)]
+    if df is None or df.empty:
+        return states
+    for key, col in (('operator', 'Operator'), ('airport', INCIDENT_AIRPORT_COL)):
+        if col in df.columns:
+            counts = df[col].value_counts()
+            states += [dict(DEFAULT_FILTERS, **{key: str(v)}) for v in counts[counts > 0].head(top).index]
+    if 'Date' in df.columns and months > 0:
+        last = pd.to_datetime(df['Date'], errors='coerce').max()
+        if pd.notna(last):
+            states += [dict(DEFAULT_FILTERS, month=(last.to_period('M') - i).start_time.strftime('%Y-%m-%d'))
+                       for i in range(months)]
+    return states
+
+
+def warm_states(limit: int = WARMUP_STATES) -> list:
+    """Logged states first, then candidate_states(), without duplicates."""
+    seen, states = set(), []
+    for store in logged_states(limit=limit) + candidate_states():
+        key = _state_key(store)
+        if key not in seen:
+            seen.add(key)
+            states.append(store)
+    return states[:limit]
+
+
+# -----------------------------------------
+# Warm-up
+# -----------------------------------------
+def warm_state(store: dict) -> float:
+    """Render one filter state like a browser would: page, then the map and chart columns."""
+    from .callbacks import filtered_data, render_page
+    from .datasets import use_dataset
+    from .pages.home import render_charts, render_map
+
+    t0 = time.perf_counter()
+    with use_dataset(store.get('dataset')):
+        render_page('store-filter', store)
+        view = filtered_data(store)
+        render_charts(view, 'count', store)
+        render_map(view)
+    return time.perf_counter() - t0
+
+
+def warm_up(limit: int = WARMUP_STATES, verbose: bool = False, budget: float = WARMUP_BUDGET) -> dict:
+    """Load the dataset and its indexes, then render warm-up filter states for up to `budget` seconds."""
+    t0 = time.perf_counter()
+    from . import anomaly, atr, rates
+    from .utils import get_data, sn_index
+
+    df = get_data()
+    t_data = time.perf_counter()
+    sn_index()
+    atr.tracker()
+    anomaly.anomalies()
+    rates.exposure()
+    states = warm_states(limit)
+    done = 0
+    for store in states:
+        if time.perf_counter() - t0 >= budget:
+            print(f"[warmup.warm_up] {budget:g}s budget spent; skipping {len(states) - done} states")
+            break
+        done += 1
+        try:
+            dt = warm_state(store)
+        except Exception as e:
+            print(f"[warmup.warm_up] failed for {store}: {e}")
+            continue
+        if verbose:
+            print(f"[warmup.warm_up] {dt:6.3f}s {_state_key(store)}")
+    total = time.perf_counter() - t0
+    print(f"[warmup.warm_up] {0 if df is None else len(df)} rows, {done} filter states; "
+          f"data {t_data - t0:.2f}s, total {total:.2f}s")
+    return {'rows': 0 if df is None else len(df), 'states': done, 'seconds': total}
+
+
+def _run():
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"[warmup._run] warm-up failed: {e}")
+
+
+def start_background_warmup():
+    """
+    Run warm_up() once per process: in a daemon thread, or inline when DGCA_WARMUP=sync
+    so a gunicorn worker only starts accepting once its caches are filled.
+    """
+    global _started
+    if not WARMUP_ENABLED:
+        return None
+    with _lock:
+        if _started:
+            return None
+        _started = True
+    if WARMUP_MODE == 'sync':
+        _run()
+        return None
+    thread = threading.Thread(target=_run, name="dgca-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render the warm-up filter states and report timings.")
+    parser.add_argument('--limit', type=int, default=WARMUP_STATES)
+    parser.add_argument('--budget', type=float, default=WARMUP_BUDGET, help='seconds')
+    args = parser.parse_args()
+    warm_up(args.limit, verbose=True, budget=args.budget)
@@ -0,0 +1,21 @@
+# gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py run:server
+#
+# The listening socket is bound by the master before workers are forked, so each worker
+# serves as soon as run.py is imported; caches are warmed afterwards in a background
+# thread (app/warmup.py, disable with DGCA_WARMUP=0). For deploys, DGCA_WARMUP=sync makes
+# each worker render the most requested filter states before it accepts requests, for
+# at most DGCA_WARMUP_BUDGET seconds (default 60, keep it well under `timeout`).
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = 120
+
+
+def post_worker_init(worker):
+    from app.warmup import start_background_warmup
+
+    start_background_warmup()
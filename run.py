@@ -1,7 +1,12 @@
-# run.py
+import time
+
+_t0 = time.perf_counter()
+
 from app import dash_app, get_layout, register_callbacks
-from app.utils import load_data, load_airport_master
 from app.auth import init_auth
+from app.export import init_export
+from app.jobs import init_jobs
+from app.warmup import start_background_warmup
 import os
 
 # Apply layout and register callbacks
@@ -15,6 +20,20 @@ except Exception:
     # ignore if not configured
     pass
 
+# Streamed CSV/Parquet export of filtered occurrences (/export/occurrences.<csv|parquet>)
+init_export(dash_app.server)
+
+# Background job status/result routes (/jobs/<id>, /jobs/<id>/result)
+init_jobs(dash_app.server)
+
+# WSGI entry point for gunicorn: `gunicorn -c gunicorn.conf.py run:server`
+server = dash_app.server
+
+print(f"[run] app ready in {time.perf_counter() - _t0:.2f}s (data and page modules load on first use / warm-up)")
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8050))
+    # with the debug reloader only the serving child process (WERKZEUG_RUN_MAIN) warms up
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_warmup()
     dash_app.run(host='0.0.0.0', port=port, debug=True)
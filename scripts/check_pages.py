@@ -0,0 +1,88 @@
+# scripts/check_pages.py
+"""
+Render check for registers with gaps: writes a synthetic register (loadtest.synth) with
+blank values in the given columns, loads it through utils.load_data() - so the compact
+dtypes of optimize_dtypes() apply - and renders every page through callbacks.render_page()
+for the default filters, the way a browser would after a navigation click.
+
+    python scripts/check_pages.py --rows 5000 --blank 100
+    python scripts/check_pages.py --blank-col 'ATR of Recommendations' --blank-col Status
+
+Exits non-zero if any page fails to render.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import traceback
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = [None, 'store-filter', 'nav-detail', 'nav-recs', 'nav-story']
+
+
+def write_register(out: str, rows: int, blank: int, cols: list, seed: int = 0) -> dict:
+    """Synthetic register in `out` with `blank` empty values per column in `cols`; returns the paths."""
+    import numpy as np
+    import pandas as pd
+
+    sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+    from loadtest import synth
+
+    synth(rows, out, seed)
+    path = os.path.join(out, 'incidents.csv')
+    df = pd.read_csv(path)
+    rng = np.random.default_rng(seed)
+    for c in cols:
+        df.loc[rng.choice(len(df), min(blank, len(df)), replace=False), c] = None
+    df.to_csv(path, index=False)
+    return {'data': path, 'master': os.path.join(out, 'airports.csv'),
+            'exposure': os.path.join(out, 'movements.csv')}
+
+
+def check(paths: dict, sn=None) -> list:
+    """Render every page of PAGES on the register at `paths`; returns the failures."""
+    sys.path.insert(0, ROOT)
+    from app import utils
+    from app.callbacks import DEFAULT_FILTERS, render_page
+
+    utils.DATA_CSV = paths['data']
+    utils.AIRPORT_MASTER_CSV = paths['master']
+    df = utils.get_data()
+    sn = sn if sn is not None else df['S/N'].iloc[0]
+    failures = []
+    for trigger in PAGES:
+        try:
+            render_page(trigger, dict(DEFAULT_FILTERS), sn=sn)
+            print(f"[check_pages] {trigger or 'initial'}: ok")
+        except Exception:
+            failures.append(trigger)
+            print(f"[check_pages] {trigger or 'initial'}: FAILED")
+            traceback.print_exc()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--blank', type=int, default=100, help='blank values per column')
+    parser.add_argument('--blank-col', action='append', dest='cols',
+                        help="column to blank (repeatable; default 'ATR of Recommendations')")
+    parser.add_argument('--out', default=None, help='directory for the register (default: a temporary one)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    out = os.path.abspath(args.out or tempfile.mkdtemp(prefix='dgca-check-'))
+    os.makedirs(out, exist_ok=True)
+    # ATR log, filter usage log and job files of the check stay out of the working tree
+    os.environ.setdefault('DGCA_EXPOSURE_PATH', os.path.join(out, 'movements.csv'))
+    os.environ.setdefault('DGCA_FILTER_LOG', os.path.join(out, 'filter_usage.jsonl'))
+    os.chdir(out)
+    paths = write_register(out, args.rows, args.blank, args.cols or ['ATR of Recommendations'], args.seed)
+    failures = check(paths)
+    print(f"[check_pages] {len(PAGES) - len(failures)}/{len(PAGES)} pages rendered")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,378 @@
+# scripts/loadtest.py
+"""
+Load test for the Dash callback endpoint (/_dash-update-component).
+
+1. Generate synthetic data and start the app on it:
+
+    python scripts/loadtest.py synth --rows 200000 --out /tmp/dgca-load
+    DGCA_DATA_CSV=/tmp/dgca-load/incidents.csv \\
+    DGCA_AIRPORT_MASTER_CSV=/tmp/dgca-load/airports.csv \\
+    DGCA_EXPOSURE_PATH=/tmp/dgca-load/movements.csv \\
+        gunicorn -c gunicorn.conf.py run:server
+
+2. Drive it with N concurrent simulated analysts:
+
+    python scripts/loadtest.py run --url http://127.0.0.1:8050 --concurrency 8 --duration 60
+
+Each simulated analyst repeatedly changes the filters and then issues the same callbacks
+a browser does after a filter change: the page (display_page), then the lazily loaded
+chart and map columns. Payloads follow the store-filter schema of layout.get_layout()
+and the callback specs served by /_dash-dependencies; filter values come from the
+dropdown options the app itself returns.
+
+Reported: throughput, p50/p95/p99 latency per callback and overall, errors, and the
+RSS of the gunicorn worker processes (read from /proc before, during and after).
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.request
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+AIRPORTS = [
+    ("DEL", "Indira Gandhi International", 28.56, 77.10), ("BOM", "Chhatrapati Shivaji Maharaj", 19.09, 72.87),
+    ("BLR", "Kempegowda International", 13.20, 77.70), ("MAA", "Chennai International", 12.99, 80.17),
+    ("CCU", "Netaji Subhas Chandra Bose", 22.65, 88.45), ("HYD", "Rajiv Gandhi International", 17.24, 78.43),
+    ("COK", "Cochin International", 10.15, 76.40), ("GOI", "Goa International", 15.38, 73.83),
+    ("AMD", "Sardar Vallabhbhai Patel", 23.07, 72.63), ("PNQ", "Pune", 18.58, 73.92),
+    ("JAI", "Jaipur International", 26.82, 75.81), ("LKO", "Chaudhary Charan Singh", 26.76, 80.89),
+    ("GAU", "Lokpriya Gopinath Bordoloi", 26.11, 91.59), ("TRV", "Trivandrum International", 8.48, 76.92),
+    ("IXC", "Chandigarh", 30.67, 76.79), ("PAT", "Jay Prakash Narayan", 25.59, 85.09),
+]
+OPERATORS = ["IndiGo", "Air India", "SpiceJet", "Vistara", "Akasa Air", "Air India Express", "Alliance Air", "Star Air"]
+AIRCRAFT = ["A320", "A321", "B737", "B787", "ATR72", "Q400", "E175"]
+PHASES = ["Standing", "Taxi", "Takeoff", "Climb", "Cruise", "Descent", "Approach", "Landing"]
+EVENTS = ["bird strike on approach", "engine vibration", "tyre burst on landing", "smoke in cabin",
+          "hydraulic leak", "runway excursion", "TCAS RA", "unstabilised approach", "cabin depressurisation"]
+SEARCH_TERMS = ["bird", "engine", "tyre", "smoke", "hydraulic", "runway", "tcas", "approach"]
+
+
+# -----------------------------------------
+# Synthetic data
+# -----------------------------------------
+def synth(rows: int, out: str, seed: int = 0):
+    import numpy as np
+    import pandas as pd
+
+    os.makedirs(out, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    codes = [a[0] for a in AIRPORTS]
+    pd.DataFrame(AIRPORTS, columns=["Code", "Airport Name", "Latitude", "Longitude"]).to_csv(
+        os.path.join(out, "airports.csv"), index=False)
+
+    # skewed operator/airport mix so there are busy and quiet series
+    op_p = rng.dirichlet(np.ones(len(OPERATORS)) * 0.8)
+    ap_p = rng.dirichlet(np.ones(len(codes)) * 0.8)
+    dates = pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 7 * 365, rows), unit="D")
+    opened = dates + pd.to_timedelta(rng.integers(10, 120, rows), unit="D")
+    df = pd.DataFrame({
+        "S/N": np.arange(1, rows + 1),
+        "Date": dates.strftime("%Y-%m-%d"),
+        "Airport / Place of occurrence": rng.choice(codes, rows, p=ap_p),
+        "Operator": rng.choice(OPERATORS, rows, p=op_p),
+        "Aircraft Type": rng.choice(AIRCRAFT, rows),
+        "Flight No": [f"6E{i}" for i in rng.integers(100, 9999, rows)],
+        "Phase of flight": rng.choice(PHASES, rows),
+        "Status": rng.choice(["Open", "Closed"], rows, p=[0.3, 0.7]),
+        "Brief Description": rng.choice(EVENTS, rows),
+        "Findings": "finding one; finding two",
+        "Probable Cause": rng.choice(["human factors", "technical", "environment", "under investigation"], rows),
+        "Recommendations": "operator to review procedures",
+        "ATR of Recommendations": rng.choice(["Pending", "Received", "Closed"], rows, p=[0.4, 0.3, 0.3]),
+        "Recommendation Date": opened.strftime("%Y-%m-%d"),
+        "ATR Date": (opened + pd.to_timedelta(rng.integers(5, 200, rows), unit="D")).strftime("%Y-%m-%d"),
+    })
+    df.to_csv(os.path.join(out, "incidents.csv"), index=False)
+
+    months = pd.period_range("2019-01", periods=7 * 12, freq="M")
+    mv = pd.MultiIndex.from_product([months, codes, OPERATORS], names=["Month", "Code", "Operator"]).to_frame(index=False)
+    mv["Movements"] = rng.integers(50, 5000, len(mv))
+    mv["Month"] = mv["Month"].astype(str)
+    mv.to_csv(os.path.join(out, "movements.csv"), index=False)
+
+    print(f"[loadtest.synth] {rows} occurrences, {len(AIRPORTS)} airports, {len(mv)} movement rows in {out}")
+    print("start the app with:")
+    print(f"  DGCA_DATA_CSV={os.path.join(out, 'incidents.csv')} "
+          f"DGCA_AIRPORT_MASTER_CSV={os.path.join(out, 'airports.csv')} "
+          f"DGCA_EXPOSURE_PATH={os.path.join(out, 'movements.csv')} gunicorn -c gunicorn.conf.py run:server")
+
+
+# -----------------------------------------
+# Callback payloads
+# -----------------------------------------
+def default_store() -> dict:
+    """Initial 'store-filter' data from layout.get_layout() (the schema the callbacks expect)."""
+    sys.path.insert(0, ROOT)
+    from app.layout import get_layout
+
+    stack = [get_layout()]
+    while stack:
+        node = stack.pop()
+        if getattr(node, 'id', None) == 'store-filter':
+            return dict(node.data)
+        children = getattr(node, 'children', None)
+        if isinstance(children, (list, tuple)):
+            stack.extend(children)
+        elif children is not None and hasattr(children, 'to_plotly_json'):
+            stack.append(children)
+    raise RuntimeError("no 'store-filter' in layout.get_layout()")
+
+
+def _parse_outputs(output: str):
+    """'..a.x...b.y..' (multi-output) or 'a.x' -> outputs field of the request body."""
+    multi = output.startswith('..')
+    parts = output.strip('.').split('...') if multi else [output]
+    outs = []
+    for part in parts:
+        cid, prop = part.rsplit('.', 1)
+        outs.append({'id': cid, 'property': prop})
+    return outs if multi else outs[0]
+
+
+class Client:
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        deps = self._get('/_dash-dependencies')
+        self.deps = {}
+        for dep in deps:
+            if '@' in dep['output']:
+                continue  # allow_duplicate outputs; not part of a filter change
+            for out in dep['output'].strip('.').split('...'):
+                self.deps.setdefault(out, dep)
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.url + path, timeout=self.timeout) as r:
+            return json.loads(r.read())
+
+    def call(self, output: str, values: dict, changed=None):
+        """POST one callback; values maps 'id.property' to the current value."""
+        dep = self.deps[output]
+        body = {
+            'output': dep['output'],
+            'outputs': _parse_outputs(dep['output']),
+            'inputs': [dict(i, value=values.get(f"{i['id']}.{i['property']}")) for i in dep['inputs']],
+            'state': [dict(s, value=values.get(f"{s['id']}.{s['property']}")) for s in dep.get('state', [])],
+            'changedPropIds': changed or [],
+        }
+        req = urllib.request.Request(self.url + '/_dash-update-component', data=json.dumps(body).encode(),
+                                     headers={'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+        # non-2xx responses raise urllib.error.HTTPError, counted as errors by run()
+        with urllib.request.urlopen(req, timeout=self.timeout) as r:
+            payload = r.read()
+        return len(payload)
+
+
+def filter_values(client: Client) -> dict:
+    """Dropdown options as served by the app (populate_filter_options)."""
+    dep = client.deps['airport-filter.options']
+    body = {'output': dep['output'], 'outputs': _parse_outputs(dep['output']),
+            'inputs': [dict(i, value=None) for i in dep['inputs']],
+            'state': [dict(st, value=None) for st in dep.get('state', [])], 'changedPropIds': []}
+    req = urllib.request.Request(client.url + '/_dash-update-component', data=json.dumps(body).encode(),
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=client.timeout) as r:
+        response = json.loads(r.read())['response']
+    return {key: [o['value'] for o in response[f'{key}-filter']['options'] if o['value'] != 'All']
+            for key in ('airport', 'operator', 'aircraft', 'phase', 'status')}
+
+
+def random_store(rng: random.Random, base: dict, values: dict) -> dict:
+    """A randomized filter state: most analysts narrow by one or two fields."""
+    store = dict(base)
+    for key in rng.sample(sorted(values), k=rng.choice([0, 1, 1, 1, 2, 2, 3])):
+        if values[key]:
+            store[key] = rng.choice(values[key])
+    if rng.random() < 0.15:
+        store['month'] = f"{rng.randint(2019, 2025)}-{rng.randint(1, 12):02d}-01"
+    elif rng.random() < 0.10:
+        year = rng.randint(2019, 2025)
+        store['date_from'] = f"{year}-{rng.randint(1, 6):02d}-01"
+        store['date_to'] = f"{year}-{rng.randint(7, 12):02d}-28"
+    if rng.random() < 0.10:
+        store['search'] = rng.choice(SEARCH_TERMS)
+    return store
+
+
+# -----------------------------------------
+# Worker memory (/proc)
+# -----------------------------------------
+def find_workers(pattern: str) -> list:
+    """PIDs whose command line matches `pattern` (gunicorn master and workers)."""
+    pids = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit() or int(name) == os.getpid():
+            continue
+        try:
+            with open(f'/proc/{name}/cmdline', 'rb') as fh:
+                cmd = fh.read().replace(b'\0', b' ').decode(errors='replace')
+            with open(f'/proc/{name}/comm') as fh:
+                comm = fh.read().strip()
+        except OSError:
+            continue
+        # skip wrappers (shells, timeout, ...) whose command line merely mentions gunicorn
+        if re.search(pattern, cmd) and (comm.startswith('python') or comm.startswith('gunicorn')):
+            pids.append(int(name))
+    return sorted(pids)
+
+
+def rss_mb(pid: int):
+    try:
+        with open(f'/proc/{pid}/status') as fh:
+            for line in fh:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+# -----------------------------------------
+# Run
+# -----------------------------------------
+def _pct(sorted_vals, q):
+    if not sorted_vals:
+        return float('nan')
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))]
+
+
+def run(url: str, concurrency: int, duration: float, requests: int, seed: int, pids: list, warmup: int):
+    client = Client(url)
+    base = default_store()
+    values = filter_values(client)
+    steps = [('page-content.children', 'store-filter.data'),
+             ('dash-charts.children', 'dash-charts.id'),
+             ('dash-map.children', 'dash-map.id')]
+    steps = [s for s in steps if s[0] in client.deps]
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    sent = [0]
+    lock = threading.Lock()
+    stop = threading.Event()
+    deadline = None  # set when the measured window starts, after the warm-up rounds
+
+    def analyst(i):
+        rng = random.Random(seed + i)
+        while not stop.is_set():
+            store = random_store(rng, base, values)
+            current = {'store-filter.data': store, 'url.search': '', 'dash-charts.id': 'dash-charts',
+                       'dash-map.id': 'dash-map', 'metric-toggle.value': 'count', 'map-mode.value': 'points'}
+            for output, changed in steps:
+                with lock:
+                    if (requests and sent[0] >= requests) or (deadline and time.perf_counter() >= deadline):
+                        stop.set()
+                        return
+                    sent[0] += 1
+                t0 = time.perf_counter()
+                try:
+                    client.call(output, current, [changed])
+                    ok = True
+                except Exception as e:
+                    ok = False
+                    with lock:
+                        errors[f"{output}: {type(e).__name__}"] += 1
+                dt = time.perf_counter() - t0
+                if ok:
+                    with lock:
+                        latencies[output].append(dt)
+
+    pids = pids or []
+    rss_before = {p: rss_mb(p) for p in pids}
+    rss_peak = dict(rss_before)
+
+    def sample_rss():
+        while not stop.wait(0.5):
+            for p in pids:
+                v = rss_mb(p)
+                if v is not None and (rss_peak.get(p) is None or v > rss_peak[p]):
+                    rss_peak[p] = v
+
+    # a few unmeasured rounds so start-up work does not skew the percentiles
+    if warmup:
+        rng = random.Random(seed - 1)
+        for _ in range(warmup):
+            current = {'store-filter.data': random_store(rng, base, values), 'url.search': '',
+                       'dash-charts.id': 'dash-charts', 'dash-map.id': 'dash-map',
+                       'metric-toggle.value': 'count', 'map-mode.value': 'points'}
+            for output, changed in steps:
+                client.call(output, current, [changed])
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    threads = [threading.Thread(target=analyst, args=(i,), daemon=True) for i in range(concurrency)]
+    t_start = time.perf_counter()
+    deadline = t_start + duration if duration else None
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t_start
+    stop.set()
+    rss_after = {p: rss_mb(p) for p in pids}
+
+    total = sum(len(v) for v in latencies.values())
+    print(f"\n{url}  concurrency={concurrency}  {total} ok / {sum(errors.values())} errors in {elapsed:.1f}s"
+          f"  ->  {total / elapsed if elapsed else 0:.1f} req/s")
+    print(f"{'callback':<24}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    everything = []
+    for output, _ in steps:
+        vals = sorted(latencies.get(output, []))
+        everything += vals
+        print(f"{output:<24}{len(vals):>7}{_pct(vals, .5) * 1e3:>10.1f}{_pct(vals, .95) * 1e3:>10.1f}"
+              f"{_pct(vals, .99) * 1e3:>10.1f}{(vals[-1] if vals else float('nan')) * 1e3:>10.1f}")
+    everything.sort()
+    print(f"{'all':<24}{len(everything):>7}{_pct(everything, .5) * 1e3:>10.1f}{_pct(everything, .95) * 1e3:>10.1f}"
+          f"{_pct(everything, .99) * 1e3:>10.1f}{(everything[-1] if everything else float('nan')) * 1e3:>10.1f}")
+    for err, n in sorted(errors.items()):
+        print(f"  error {err}: {n}")
+    if pids:
+        print(f"\n{'pid':>8}{'RSS before MB':>15}{'peak MB':>10}{'after MB':>10}")
+        for p in pids:
+            fmt = lambda v: f"{v:.0f}" if v is not None else '-'
+            print(f"{p:>8}{fmt(rss_before.get(p)):>15}{fmt(rss_peak.get(p)):>10}{fmt(rss_after.get(p)):>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    sub = parser.add_subparsers(dest='cmd', required=True)
+
+    p_synth = sub.add_parser('synth', help='write synthetic incidents / airports / movements CSVs')
+    p_synth.add_argument('--rows', type=int, default=200000)
+    p_synth.add_argument('--out', default='loadtest-data')
+    p_synth.add_argument('--seed', type=int, default=0)
+
+    p_run = sub.add_parser('run', help='drive /_dash-update-component and report latency')
+    p_run.add_argument('--url', default='http://127.0.0.1:8050')
+    p_run.add_argument('--concurrency', type=int, nargs='+', default=[4],
+                       help='one or more concurrency levels, run one after another')
+    p_run.add_argument('--duration', type=float, default=30.0, help='seconds per level (0 = use --requests)')
+    p_run.add_argument('--requests', type=int, default=0, help='stop after this many requests per level')
+    p_run.add_argument('--warmup', type=int, default=3, help='unmeasured filter changes before each level')
+    p_run.add_argument('--seed', type=int, default=1)
+    p_run.add_argument('--pid', type=int, action='append', help='process to report RSS for (repeatable)')
+    p_run.add_argument('--match', default=r'gunicorn.*run:server',
+                       help='regex over /proc/*/cmdline used when no --pid is given')
+
+    args = parser.parse_args(argv)
+    if args.cmd == 'synth':
+        synth(args.rows, args.out, args.seed)
+        return
+    if args.duration <= 0 and args.requests <= 0:
+        p_run.error('give a positive --duration or --requests (each level would never stop)')
+    pids = args.pid or find_workers(args.match)
+    for c in args.concurrency:
+        run(args.url, c, args.duration, args.requests, args.seed, pids, args.warmup)
+
+
+if __name__ == '__main__':
+    main()